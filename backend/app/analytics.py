@@ -1,77 +1,310 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, extract, func, select
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Literal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from app.db import get_session
-from app.deps import get_current_user
-from app.models import Category, Expense, User
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import DateTime, cast, literal, literal_column, tuple_
+from sqlmodel import extract, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cache import analytics_cache
+from app.deps import get_current_user, get_read_session
+from app.models import Category, DailySpend, User
+from app.profiler import query_budget
+from app.versions import check_data_version, get_data_version
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+Granularity = Literal["day", "week", "month", "quarter", "year"]
+
+# range used by /spending when date_from is not given
+DEFAULT_RANGES = {
+    "day": timedelta(days=30),
+    "week": timedelta(weeks=12),
+    "month": timedelta(days=365),
+    "quarter": timedelta(days=2 * 365),
+    "year": timedelta(days=5 * 365),
+}
+# generate_series step per granularity, postgres has no "1 quarter" interval
+STEPS = {
+    "day": "1 day",
+    "week": "1 week",
+    "month": "1 month",
+    "quarter": "3 months",
+    "year": "1 year",
+}
+
 
 @router.get("/spending-by-date")
-def get_analytics(
+async def get_analytics(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    version: int = Depends(get_data_version),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    key = analytics_cache.key(current_user.id, version, "spending-by-date")
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
     stmt = (
         select(
-            Expense.date,
-            func.sum(Expense.amount).label("total"),
+            DailySpend.date,
+            func.sum(DailySpend.total).label("total"),
         )
-        .where(Expense.user_id == current_user.id)
-        .group_by(Expense.date)
-        .order_by(Expense.date)
+        .where(DailySpend.user_id == current_user.id)
+        .group_by(DailySpend.date)
+        .order_by(DailySpend.date)
     )
 
-    rows = session.exec(stmt).all()
+    rows = (await session.exec(stmt)).all()
 
-    return {
+    result = {
         "labels": [str(date) for date, _ in rows],
         "data": [total for _, total in rows],
     }
+    return analytics_cache.set(key, result)
 
 
 @router.get("/spending-by-category")
-def spending_by_category(
-    session: Session = Depends(get_session),
+async def spending_by_category(
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
+    version: int = Depends(get_data_version),
 ):
+    key = analytics_cache.key(current_user.id, version, "spending-by-category")
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
     stmt = (
         select(
             Category.name,
-            func.sum(Expense.amount).label("total"),
+            func.sum(DailySpend.total).label("total"),
         )
-        .join(Expense, Expense.category_id == Category.id)
-        .where(Expense.user_id == current_user.id)
+        .join(DailySpend, DailySpend.category_id == Category.id)
+        .where(DailySpend.user_id == current_user.id)
         .group_by(Category.name)
     )
 
-    rows = session.exec(stmt).all()
+    rows = (await session.exec(stmt)).all()
 
-    return {
+    result = {
         "labels": [name for name, _ in rows],
         "data": [total for _, total in rows],
     }
+    return analytics_cache.set(key, result)
 
 
 @router.get("/spending-by-month")
-def spending_by_month(
-    session: Session = Depends(get_session),
+async def spending_by_month(
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
+    version: int = Depends(get_data_version),
 ):
+    key = analytics_cache.key(current_user.id, version, "spending-by-month")
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
     stmt = (
         select(
-            extract("month", Expense.date).label("month"),
-            func.sum(Expense.amount).label("total"),
+            extract("month", DailySpend.date).label("month"),
+            func.sum(DailySpend.total).label("total"),
         )
-        .where(Expense.user_id == current_user.id)
+        .where(DailySpend.user_id == current_user.id)
         .group_by("month")
         .order_by("month")
     )
 
-    rows = session.exec(stmt).all()
+    rows = (await session.exec(stmt)).all()
 
-    return {
+    result = {
         "labels": [int(month) for month, _ in rows],
         "data": [total for _, total in rows],
     }
+    return analytics_cache.set(key, result)
+
+
+# the range /spending covers. expense dates are already local calendar dates,
+# the timezone only decides what "today" is for the default range
+def spending_range(
+    granularity: Granularity = "month",
+    date_from: date | None = None,
+    date_to: date | None = None,
+    tz: str = "UTC",
+) -> tuple[date, date]:
+    try:
+        today = datetime.now(ZoneInfo(tz)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Unknown timezone")
+
+    date_to = date_to or today
+    date_from = date_from or date_to - DEFAULT_RANGES[granularity]
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    return date_from, date_to
+
+
+# a defaulted range moves at midnight while the data version stays put, so
+# the resolved range is part of the etag
+async def spending_version(
+    request: Request,
+    response: Response,
+    span: tuple[date, date] = Depends(spending_range),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+) -> int:
+    return await check_data_version(request, response, current_user, session, *span)
+
+
+# spending per day/week/month/quarter/year bucket over a date range, with
+# empty buckets filled in by generate_series
+@router.get("/spending")
+@query_budget(3)
+async def spending(
+    granularity: Granularity = "month",
+    category_id: uuid.UUID | None = None,
+    span: tuple[date, date] = Depends(spending_range),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+    version: int = Depends(spending_version),
+):
+    date_from, date_to = span
+
+    key = analytics_cache.key(
+        current_user.id,
+        version,
+        "spending",
+        (granularity, date_from, date_to, category_id),
+    )
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # granularity is one of the literals above, so it is safe to inline
+    unit = literal_column(f"'{granularity}'")
+    step = literal_column(f"interval '{STEPS[granularity]}'")
+    bucket = func.date_trunc(unit, cast(DailySpend.date, DateTime))
+
+    spend = (
+        select(bucket.label("bucket"), func.sum(DailySpend.total).label("total"))
+        .where(
+            DailySpend.user_id == current_user.id,
+            DailySpend.date >= date_from,
+            DailySpend.date <= date_to,
+        )
+        .group_by(bucket)
+    )
+    if category_id:
+        spend = spend.where(DailySpend.category_id == category_id)
+    spend = spend.subquery("spend")
+
+    buckets = select(
+        func.generate_series(
+            func.date_trunc(unit, cast(literal(date_from), DateTime)),
+            func.date_trunc(unit, cast(literal(date_to), DateTime)),
+            step,
+        ).label("bucket")
+    ).subquery("buckets")
+
+    stmt = (
+        select(buckets.c.bucket, func.coalesce(spend.c.total, 0.0))
+        .outerjoin(spend, spend.c.bucket == buckets.c.bucket)
+        .order_by(buckets.c.bucket)
+    )
+
+    rows = (await session.exec(stmt)).all()
+
+    result = {
+        "granularity": granularity,
+        "labels": [bucket.date().isoformat() for bucket, _ in rows],
+        "data": [total for _, total in rows],
+    }
+    return analytics_cache.set(key, result)
+
+
+# every dashboard series plus totals in one pass over the rollup
+@router.get("/dashboard")
+@query_budget(3)
+async def dashboard(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    category_id: uuid.UUID | None = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user),
+    version: int = Depends(get_data_version),
+):
+    key = analytics_cache.key(
+        current_user.id, version, "dashboard", (date_from, date_to, category_id)
+    )
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
+    month = func.date_trunc(
+        literal_column("'month'"), cast(DailySpend.date, DateTime)
+    ).label("month")
+    # GROUPING() bits are date, category, month from high to low, so each
+    # grouping set gets its own id
+    grouping = func.grouping(DailySpend.date, Category.name, month).label("grouping")
+    stmt = (
+        select(
+            grouping,
+            DailySpend.date,
+            Category.name,
+            month,
+            func.sum(DailySpend.total).label("total"),
+            func.sum(DailySpend.count).label("count"),
+        )
+        .join(Category, Category.id == DailySpend.category_id)
+        .where(DailySpend.user_id == current_user.id)
+        .group_by(
+            func.grouping_sets(
+                tuple_(DailySpend.date),
+                tuple_(Category.name),
+                tuple_(month),
+                tuple_(),
+            )
+        )
+    )
+    if date_from:
+        stmt = stmt.where(DailySpend.date >= date_from)
+    if date_to:
+        stmt = stmt.where(DailySpend.date <= date_to)
+    if category_id:
+        stmt = stmt.where(DailySpend.category_id == category_id)
+
+    rows = (await session.exec(stmt)).all()
+
+    by_date = sorted((row.date, row.total) for row in rows if row.grouping == 0b011)
+    by_category = sorted(
+        ((row.name, row.total) for row in rows if row.grouping == 0b101),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    by_month = sorted((row.month, row.total) for row in rows if row.grouping == 0b110)
+    totals = next((row for row in rows if row.grouping == 0b111), None)
+
+    result = {
+        "total": totals.total if totals else 0,
+        "count": totals.count if totals else 0,
+        "by_date": {
+            "labels": [str(day) for day, _ in by_date],
+            "data": [total for _, total in by_date],
+        },
+        "by_category": {
+            "labels": [name for name, _ in by_category],
+            "data": [total for _, total in by_category],
+        },
+        "by_month": {
+            "labels": [month.strftime("%Y-%m") for month, _ in by_month],
+            "data": [total for _, total in by_month],
+        },
+    }
+    return analytics_cache.set(key, result)
+
+
+@router.get("/cache-stats")
+async def cache_stats(current_user: User = Depends(get_current_user)):
+    return analytics_cache.stats()
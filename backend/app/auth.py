@@ -1,21 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db import get_session
 from app.models import User
 from app.schemas import RegisterRequest
-from app.security import create_access_token, hash_password, verify_password
+from app.security import (
+    create_access_token,
+    hash_password,
+    password_hasher,
+    verify_and_update_password,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 # create user
 @router.post("/register")
-def register(data: RegisterRequest, session: Session = Depends(get_session)):
-    existing = session.exec(
-        select(User).where(
-            (User.username == data.username) | (User.email == data.email)
+async def register(
+    data: RegisterRequest, session: AsyncSession = Depends(get_session)
+):
+    existing = (
+        await session.exec(
+            select(User).where(
+                (User.username == data.username) | (User.email == data.email)
+            )
         )
     ).first()
     if existing:
@@ -24,28 +34,44 @@ def register(data: RegisterRequest, session: Session = Depends(get_session)):
     user = User(
         username=data.username,
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await password_hasher.run(hash_password, data.password),
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     return {"id": user.id, "username": user.username}
 
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
+    user = (
+        await session.exec(select(User).where(User.username == form_data.username))
+    ).first()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    token = create_access_token(user.username)
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if not user:
+        raise credentials_exception
+
+    verified, new_hash = await password_hasher.run(
+        verify_and_update_password, form_data.password, user.hashed_password
+    )
+    if not verified:
+        raise credentials_exception
+
+    # stored hash used outdated argon2 params, upgrade it transparently
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+
+    token = create_access_token(user.username, user.token_version)
     return {"access_token": token, "token_type": "bearer"}
@@ -0,0 +1,244 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Date,
+    Float,
+    String,
+    Uuid,
+    any_,
+    bindparam,
+    cast,
+    column,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Category, Expense
+from app.rollup import apply_deltas, as_date
+from app.schemas import BatchCreate, BatchDelete, BatchOperation, BatchUpdate
+
+expenses = Expense.__table__
+
+RETURNING = (
+    expenses.c.id,
+    expenses.c.amount,
+    expenses.c.description,
+    expenses.c.category_id,
+    expenses.c.date,
+    expenses.c.created_at,
+    expenses.c.updated_at,
+)
+
+
+# apply a batch of operations with one statement per operation type, in the
+# session's transaction. creates run first, then updates, then deletes, and
+# results come back in input order. now stamps every changed row
+async def apply_batch(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    operations: list[BatchOperation],
+    now: datetime,
+) -> list[dict]:
+    results: list[dict] = [{} for _ in operations]
+    deltas: dict[tuple[date, uuid.UUID], list] = defaultdict(lambda: [0.0, 0])
+
+    creates: list[tuple[int, BatchCreate]] = []
+    updates: list[tuple[int, BatchUpdate]] = []
+    deletes: list[tuple[int, BatchDelete]] = []
+    seen: set[uuid.UUID] = set()
+
+    for index, op in enumerate(operations):
+        if isinstance(op, BatchCreate):
+            creates.append((index, op))
+        elif op.id in seen:
+            # one statement can't change the same row twice
+            results[index] = _error(op, "Duplicate id in batch")
+        else:
+            seen.add(op.id)
+            if isinstance(op, BatchUpdate):
+                updates.append((index, op))
+            else:
+                deletes.append((index, op))
+
+    if creates:
+        await _create(session, user_id, creates, results, deltas, now)
+    if updates:
+        await _update(session, user_id, updates, results, deltas, now)
+    if deletes:
+        await _delete(session, user_id, deletes, results, deltas, now)
+
+    await apply_deltas(
+        session, user_id, {key: tuple(delta) for key, delta in deltas.items()}
+    )
+    return results
+
+
+async def _create(session, user_id, creates, results, deltas, now):
+    category_ids = {op.category_id for _, op in creates}
+    owned = set(
+        (
+            await session.execute(
+                select(Category.id).where(
+                    Category.user_id == user_id, Category.id.in_(category_ids)
+                )
+            )
+        ).scalars()
+    )
+
+    rows = []
+    for index, op in creates:
+        if op.category_id not in owned:
+            results[index] = _error(op, "Category not found")
+            continue
+
+        row = {
+            "id": uuid.uuid4(),
+            "amount": op.amount,
+            "description": op.description,
+            "category_id": op.category_id,
+            "user_id": user_id,
+            "date": as_date(op.date),
+            "created_at": now,
+            "updated_at": now,
+        }
+        rows.append((index, row))
+
+    if not rows:
+        return
+
+    # ids are generated here, so rows are matched back by id
+    returned = await session.execute(
+        insert(expenses).values([row for _, row in rows]).returning(*RETURNING)
+    )
+    by_id = {row.id: row for row in returned}
+
+    for index, row in rows:
+        expense = by_id[row["id"]]
+        results[index] = _result("create", "created", expense)
+        _add(deltas, expense.date, expense.category_id, expense.amount, 1)
+
+
+async def _update(session, user_id, updates, results, deltas, now):
+    changes = values(
+        column("id", Uuid),
+        column("amount", Float),
+        column("description", String),
+        column("date", Date),
+        name="changes",
+    ).data(
+        [
+            # like PUT /expenses/{id}, a zero amount or an empty description
+            # leaves the field unchanged
+            (
+                op.id,
+                op.amount or None,
+                op.description or None,
+                op.date and as_date(op.date),
+            )
+            for _, op in updates
+        ]
+    )
+    # join the locked pre-update rows so returning can see the old values
+    # for the rollup
+    old = (
+        select(expenses.c.id, expenses.c.amount, expenses.c.date)
+        .where(
+            expenses.c.id.in_([op.id for _, op in updates]),
+            expenses.c.user_id == user_id,
+            expenses.c.deleted_at.is_(None),
+        )
+        .with_for_update()
+        .subquery("old")
+    )
+
+    # casts keep all-null columns in the VALUES list from defaulting to text
+    stmt = (
+        update(expenses)
+        .where(expenses.c.id == changes.c.id, expenses.c.id == old.c.id)
+        .values(
+            amount=func.coalesce(cast(changes.c.amount, Float), expenses.c.amount),
+            description=func.coalesce(
+                cast(changes.c.description, String), expenses.c.description
+            ),
+            date=func.coalesce(cast(changes.c.date, Date), expenses.c.date),
+            updated_at=now,
+        )
+        .returning(
+            *RETURNING,
+            old.c.amount.label("old_amount"),
+            old.c.date.label("old_date"),
+        )
+    )
+    by_id = {row.id: row for row in await session.execute(stmt)}
+
+    for index, op in updates:
+        expense = by_id.get(op.id)
+        if expense is None:
+            results[index] = _result("update", "not_found", id=op.id)
+            continue
+
+        results[index] = _result("update", "updated", expense)
+        _add(deltas, expense.old_date, expense.category_id, -expense.old_amount, -1)
+        _add(deltas, expense.date, expense.category_id, expense.amount, 1)
+
+
+async def _delete(session, user_id, deletes, results, deltas, now):
+    ids = [op.id for _, op in deletes]
+    # deleted rows stay behind as tombstones for delta sync
+    stmt = (
+        update(expenses)
+        .where(
+            expenses.c.user_id == user_id,
+            expenses.c.id == any_(bindparam("ids", ids, type_=ARRAY(Uuid))),
+            expenses.c.deleted_at.is_(None),
+        )
+        .values(deleted_at=now, updated_at=now)
+        .returning(*RETURNING)
+    )
+    by_id = {row.id: row for row in await session.execute(stmt)}
+
+    for index, op in deletes:
+        expense = by_id.get(op.id)
+        if expense is None:
+            results[index] = _result("delete", "not_found", id=op.id)
+            continue
+
+        results[index] = _result("delete", "deleted", id=op.id)
+        _add(deltas, expense.date, expense.category_id, -expense.amount, -1)
+
+
+def _add(deltas, day: date, category_id: uuid.UUID, amount: float, count: int):
+    delta = deltas[(day, category_id)]
+    delta[0] += amount
+    delta[1] += count
+
+
+def _result(op: str, status: str, expense=None, id: uuid.UUID | None = None) -> dict:
+    result = {"op": op, "status": status, "id": expense.id if expense else id}
+    if expense is not None:
+        result["expense"] = {
+            "id": expense.id,
+            "amount": expense.amount,
+            "description": expense.description,
+            "category_id": expense.category_id,
+            "date": expense.date,
+            "created_at": expense.created_at,
+            "updated_at": expense.updated_at,
+        }
+    return result
+
+
+def _error(op: BatchOperation, detail: str) -> dict:
+    return {
+        "op": op.op,
+        "status": "error",
+        "id": getattr(op, "id", None),
+        "detail": detail,
+    }
@@ -1,33 +1,36 @@
 from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.db import get_session
-from app.deps import get_current_user
+from app.deps import get_current_user, get_read_session
 from app.models import Category, User
 from app.schemas import CategoryRequest
+from app.versions import bump_data_version, get_data_version
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 # list all categories
-@router.get("/")
-def get_categories(
+@router.get("/", dependencies=[Depends(get_data_version)])
+async def get_categories(
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     stmt = select(Category).where(Category.user_id == current_user.id)
-    return session.exec(stmt).all()
+    return (await session.exec(stmt)).all()
 
 
 # add a category
 @router.post("/")
-def add_category(
+async def add_category(
     data: CategoryRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
+    await bump_data_version(session, current_user.id)
     category = Category(name=data.name, color=data.color, user_id=current_user.id)
     session.add(category)
-    session.commit()
-    session.refresh(category)
+    await session.commit()
+    await session.refresh(category)
     return category
@@ -0,0 +1,38 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# bodies that are already compressed, gzipping them again only costs cpu and
+# leaves clients with a .gz.gz they didn't ask for
+COMPRESSED_TYPES = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+)
+
+
+class _Responder(GZipResponder):
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(COMPRESSED_TYPES):
+                # passed through untouched, like starlette's own exclusions
+                self.content_type_is_excluded = True
+
+
+# starlette's gzip middleware, minus already-compressed media types
+class CompressionMiddleware(GZipMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await super().__call__(scope, receive, send)
+            return
+        if "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await super().__call__(scope, receive, send)
+            return
+
+        responder = _Responder(
+            self.app, self.minimum_size, compresslevel=self.compresslevel
+        )
+        await responder(scope, receive, send)
@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,6 +11,62 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # optional read replica for GET routes, the primary serves everything if
+    # unset. can point at the primary itself for local testing
+    DATABASE_REPLICA_URL: str | None = None
+    # a user's reads stay on the primary this long after their last write
+    DB_REPLICA_STICKY_SECONDS: float = 5
+    DB_REPLICA_STICKY_USERS: int = 10000
+
+    # opt-in query profiling for development and staging, see app/profiler.py
+    DB_SLOW_QUERY_MS: float | None = None
+    DB_EXPLAIN_SLOW_QUERIES: bool = False
+    DB_N_PLUS_ONE_THRESHOLD: int | None = None
+    DB_QUERY_BUDGET: int | None = None
+    # raise instead of logging when a request goes over its budget, for tests
+    DB_QUERY_BUDGET_STRICT: bool = False
+
+    ANALYTICS_CACHE_SIZE: int = 1024
+    ANALYTICS_CACHE_TTL: float = 60
+
+    # yearly expense partitions are created this many years ahead on startup
+    EXPENSE_PARTITION_YEARS_AHEAD: int = 1
+
+    # background jobs, see app/jobs.py. they get their own small pool so a
+    # long export never holds a connection request handlers are waiting for
+    JOB_CONCURRENCY: int = 2
+    JOB_MAX_PENDING_PER_USER: int = 5
+    # jobs fail once this old. a queued or running job past it was orphaned
+    # by a process that died, and stops counting toward the pending limit
+    JOB_TIMEOUT_SECONDS: float = 3600
+    JOB_RESULTS_DIR: Path = Path(tempfile.gettempdir()) / "expense-tracker-jobs"
+    # finished jobs are deleted with their result files once this old. each
+    # app process sweeps for them every JOB_CLEANUP_INTERVAL_SECONDS, None
+    # turns the sweep off
+    JOB_RETENTION_SECONDS: float = 86400
+    JOB_CLEANUP_INTERVAL_SECONDS: float | None = 3600
+
+    # seconds between recurring expense passes in each app process, None
+    # leaves them to `python -m app.recurring` from cron
+    RECURRING_INTERVAL_SECONDS: float | None = 3600
+
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_TTL: float = 60
+
+    # changing these rehashes each password on its next successful login
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
     model_config = SettingsConfigDict(
         env_file=BASE_DIR / ".env",
         env_ignore_empty=True,
@@ -1,13 +1,132 @@
-from sqlmodel import Session, create_engine
+import time
+import uuid
 
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.cache import recent_writers
 from app.config import settings
 
-engine = create_engine(
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.overflows = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+# queue pool that records how long callers wait for a connection, and how
+# often the pool overflows or times out
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - start)
+
+    def _create_connection(self):
+        if self.overflow() > 0:
+            pool_stats.overflows += 1
+        return super()._create_connection()
+
+
+# postgresql+psycopg urls resolve to psycopg's async driver here
+def _create_engine(url: str, poolclass, **overrides) -> AsyncEngine:
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    return create_async_engine(url, poolclass=poolclass, **{**options, **overrides})
+
+
+engine = _create_engine(settings.DATABASE_URL, InstrumentedPool)
+
+# pool stats above cover the primary only
+replica_engine = (
+    _create_engine(settings.DATABASE_REPLICA_URL, AsyncAdaptedQueuePool)
+    if settings.DATABASE_REPLICA_URL
+    else engine
+)
+# a running job holds one connection for its cursor and one for progress
+job_engine = _create_engine(
     settings.DATABASE_URL,
-    echo=True,
+    AsyncAdaptedQueuePool,
+    pool_size=2 * settings.JOB_CONCURRENCY,
+    max_overflow=0,
+)
+# the recurring scheduler runs one transaction at a time, its own connection
+# keeps a pass from waiting on busy jobs or holding a job's connection
+scheduler_engine = _create_engine(
+    settings.DATABASE_URL, AsyncAdaptedQueuePool, pool_size=1, max_overflow=0
 )
+engines = [engine, job_engine, scheduler_engine]
+if replica_engine is not engine:
+    engines.append(replica_engine)
+
 
+def get_pool_status() -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "checkouts": pool_stats.checkouts,
+        "overflows": pool_stats.overflows,
+        "timeouts": pool_stats.timeouts,
+        "wait_seconds_total": pool_stats.wait_seconds_total,
+        "wait_seconds_max": pool_stats.wait_seconds_max,
+    }
 
-def get_session():
-    with Session(engine) as session:
+
+async def get_session():
+    # keep loaded objects usable after commit, lazy refreshes can't run async
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
+
+
+# the replica may lag behind the primary, so a user who just wrote reads from
+# the primary until the stickiness window runs out
+def read_engine(user_id: uuid.UUID) -> AsyncEngine:
+    if replica_engine is engine or recent_writers.get(user_id) is not None:
+        return engine
+    return replica_engine
+
+
+# remember which user a transaction writes for, the window opens once it
+# commits. stickiness is per process, like the other caches
+def mark_write(session: AsyncSession, user_id: uuid.UUID):
+    session.info["written_user_id"] = user_id
+
+
+@event.listens_for(Session, "after_commit")
+def remember_writer(session: Session):
+    user_id = session.info.pop("written_user_id", None)
+    if user_id is not None:
+        recent_writers.set(user_id, True)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_writer(session: Session):
+    session.info.pop("written_user_id", None)
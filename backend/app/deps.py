@@ -1,18 +1,22 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlmodel import Session, select
+from sqlalchemy import event, inspect
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.cache import principal_cache
+from app.db import get_session, read_engine
+from app.metrics import timing
 from app.models import User
 from app.security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -20,17 +24,56 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = decode_token(token)
-        username: str | None = payload.get("sub")
-        if not username:
+    with timing("auth"):
+        try:
+            payload = decode_token(token)
+            username: str | None = payload.get("sub")
+            version = payload.get("ver", 0)
+            if not username:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = session.exec(select(User).where(User.username == username)).first()
+        # repeat requests skip the users table until the entry expires. the
+        # cache is per process, so a token issued after another process
+        # bumped the user's token version means this entry is stale
+        user = principal_cache.get(username)
+        if user is None or user.token_version < version:
+            user = (
+                await session.exec(select(User).where(User.username == username))
+            ).first()
+            if user:
+                # cache a detached copy so requests never share session state
+                principal_cache.set(username, User.model_validate(user))
 
-    if not user or user.disabled:
+    if not user or user.disabled or user.token_version != version:
         raise credentials_exception
 
     return user
+
+
+# session for read-only routes, on the replica unless the caller wrote recently
+async def get_read_session(current_user: User = Depends(get_current_user)):
+    bind = read_engine(current_user.id)
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        yield session
+
+
+# disabling, re-enabling or renaming a user revokes their tokens
+@event.listens_for(User, "before_update")
+def bump_token_version(mapper, connection, target: User):
+    state = inspect(target)
+    if (
+        state.attrs.disabled.history.has_changes()
+        or state.attrs.username.history.has_changes()
+    ):
+        target.token_version += 1
+
+
+# drop cached principals as soon as a user row is changed through the orm
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_principal(mapper, connection, target: User):
+    principal_cache.pop(target.username)
+    for old_username in inspect(target).attrs.username.history.deleted:
+        principal_cache.pop(old_username)
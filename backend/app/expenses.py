@@ -1,125 +1,549 @@
+import base64
+import csv
+import json
 import uuid
 from datetime import date, datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Float,
+    String,
+    Uuid,
+    func,
+    insert,
+    literal,
+    or_,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
-from app.deps import get_current_user
+from app import batch, exporter, importer
+from app.db import get_session, read_engine
+from app.deps import get_current_user, get_read_session
+from app.metrics import timing
 from app.models import Category, Expense, User
-from app.schemas import CreateExpense, ExpenseRead
+from app.profiler import query_budget
+from app.rollup import apply_deltas, as_date
+from app.schemas import (
+    BatchRequest,
+    CreateExpense,
+    ExpenseChanges,
+    ExpensePage,
+)
+from app.versions import bump_data_version, get_data_version
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+
+expenses = Expense.__table__
+# everything but generated columns, for write responses
+COLUMNS = tuple(column for column in expenses.c if column.computed is None)
+# an update that moves a recurring rule's expense onto a date the rule already
+# has breaks the unique (recurring_id, date) index
+RECURRING_DATE_TAKEN = "The recurring expense already has an expense on that date"
+
+# list reads select plain columns and build response dicts from the rows,
+# skipping ORM instances and response_model validation
+READ_COLUMNS = (
+    Expense.id,
+    Expense.amount,
+    Expense.description,
+    Expense.date,
+    Expense.created_at,
+    Expense.updated_at,
+    Category.id.label("category_id"),
+    Category.name.label("category_name"),
+    Category.color.label("category_color"),
+)
+
+
+# same shape as ExpenseRead
+def expense_row(row) -> dict:
+    return {
+        "id": row.id,
+        "amount": row.amount,
+        "description": row.description,
+        "date": row.date,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "category": {
+            "id": row.category_id,
+            "name": row.category_name,
+            "color": row.category_color,
+        },
+    }
+
 
 # create expenses
 @router.post("/")
-def create_expense(
+@query_budget(4)
+async def create_expense(
     data: CreateExpense,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    # check if category exists
-    category = session.exec(
-        select(Category).where(Category.id == data.category_id)
-    ).first()
-    if not category:
+    now = await bump_data_version(session, current_user.id)
+
+    # insert only if the category exists and belongs to the user
+    source = select(
+        literal(uuid.uuid4(), Uuid),
+        literal(data.amount, Float),
+        literal(data.description, String),
+        Category.id,
+        literal(current_user.id, Uuid),
+        literal(as_date(data.date), Date),
+        literal(now, DateTime),
+        literal(now, DateTime),
+    ).where(Category.id == data.category_id, Category.user_id == current_user.id)
+    stmt = (
+        insert(expenses)
+        .from_select(
+            [
+                "id",
+                "amount",
+                "description",
+                "category_id",
+                "user_id",
+                "date",
+                "created_at",
+                "updated_at",
+            ],
+            source,
+        )
+        .returning(*COLUMNS)
+    )
+
+    expense = (await session.execute(stmt)).first()
+    if not expense:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    expense = Expense(
-        amount=data.amount,
-        description=data.description,
-        date=data.date,
-        category_id=data.category_id,
-        user_id=current_user.id,
+    await apply_deltas(
+        session,
+        current_user.id,
+        {(expense.date, expense.category_id): (expense.amount, 1)},
     )
+    await session.commit()
 
-    session.add(expense)
-    session.commit()
-    session.refresh(expense)
+    return expense._asdict()
 
-    return expense
+
+# bulk import expenses from a csv or ndjson upload
+@router.post("/import")
+async def import_expenses(
+    file: UploadFile,
+    format: Literal["csv", "ndjson"] = "csv",
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    now = await bump_data_version(session, current_user.id)
+    try:
+        imported, failed, errors = await importer.import_expenses(
+            session, current_user.id, file.file, format, now
+        )
+    except (csv.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Could not parse upload")
+
+    await session.commit()
+
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+# apply many creates, updates and deletes in one transaction
+@router.post("/batch")
+async def batch_expenses(
+    data: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    now = await bump_data_version(session, current_user.id)
+    try:
+        results = await batch.apply_batch(
+            session, current_user.id, data.operations, now
+        )
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=RECURRING_DATE_TAKEN)
+    await session.commit()
+
+    return {"results": results}
 
 
 # get expenses with filters like date range and/or category
-@router.get("/", response_model=list[ExpenseRead])
-def get_expenses(
+@router.get(
+    "/", response_model=ExpensePage, dependencies=[Depends(get_data_version)]
+)
+@query_budget(3)
+async def get_expenses(
+    response: Response,
     date_from: datetime | None = None,
     date_to: datetime | None = None,
     category_id: uuid.UUID | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    stmt = (
+        select(*READ_COLUMNS)
+        .join(Category, Category.id == Expense.category_id)
+        .order_by(Expense.date.desc(), Expense.id.desc())
+    )
+    stmt = _filter_expenses(stmt, current_user, date_from, date_to, category_id)
+
+    # stream every matching row as ndjson instead of returning a page
+    if stream:
+        return StreamingResponse(
+            _stream_expenses(stmt, session.bind),
+            media_type="application/x-ndjson",
+        )
+
+    if cursor:
+        stmt = stmt.where(tuple_(Expense.date, Expense.id) < _decode_cursor(cursor))
+
+    # fetch one extra row to know whether there is a next page
+    rows = (await session.exec(stmt.limit(limit + 1))).all()
+    items = rows[:limit]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > limit else None
+
+    # a returned response skips the dependency response, so carry its etag
+    with timing("serialize"):
+        return ORJSONResponse(
+            {"items": [expense_row(row) for row in items], "next_cursor": next_cursor},
+            headers=response.headers,
+        )
+
+
+# expenses created, updated or deleted since a cursor from an earlier call,
+# oldest change first. without a cursor every row is returned, so a client
+# can bootstrap and then keep polling with next_cursor
+@router.get(
+    "/changes",
+    response_model=ExpenseChanges,
+    dependencies=[Depends(get_data_version)],
+)
+@query_budget(3)
+async def get_changes(
+    response: Response,
+    since: str | None = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     stmt = (
-        select(Expense)
+        select(*READ_COLUMNS, Expense.deleted_at)
+        .join(Category, Category.id == Expense.category_id)
         .where(Expense.user_id == current_user.id)
-        .options(selectinload(Expense.category))
+        .order_by(Expense.updated_at, Expense.id)
     )
+    if since:
+        stmt = stmt.where(
+            tuple_(Expense.updated_at, Expense.id) > _decode_since(since)
+        )
+
+    rows = (await session.exec(stmt.limit(limit + 1))).all()
+    changed = rows[:limit]
+
+    with timing("serialize"):
+        return ORJSONResponse(
+            {
+                "items": [
+                    expense_row(row) for row in changed if row.deleted_at is None
+                ],
+                "deleted": [row.id for row in changed if row.deleted_at],
+                # nothing new keeps the client's cursor
+                "next_cursor": _encode_since(changed[-1]) if changed else since,
+                "has_more": len(rows) > limit,
+            },
+            headers=response.headers,
+        )
+
+
+# ranked search over descriptions: full-text matches plus typo-tolerant
+# trigram matches, best first, keyset-paginated on (rank, id)
+@router.get(
+    "/search", response_model=ExpensePage, dependencies=[Depends(get_data_version)]
+)
+@query_budget(3)
+async def search_expenses(
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    after = _decode_rank_cursor(cursor) if cursor else None
+    stmt = search_statement(current_user, q, after)
+
+    rows = (await session.exec(stmt.limit(limit + 1))).all()
+    items = rows[:limit]
+    next_cursor = _encode_rank_cursor(items[-1]) if len(rows) > limit else None
+
+    with timing("serialize"):
+        return ORJSONResponse(
+            {"items": [expense_row(row) for row in items], "next_cursor": next_cursor},
+            headers=response.headers,
+        )
+
+
+# export expenses as a csv or ndjson download, optionally gzipped
+@router.get("/export")
+async def export_expenses(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    category_id: uuid.UUID | None = None,
+    current_user: User = Depends(get_current_user),
+):
+    stmt = export_statement(current_user, date_from, date_to, category_id)
+    filename, media_type = exporter.file_type(format, gzip)
+
+    return StreamingResponse(
+        exporter.export_rows(stmt, format, gzip, read_engine(current_user.id)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# rows for /search, best match first, after a (rank, id) cursor if given
+def search_statement(user: User, q: str, after: tuple[float, uuid.UUID] | None):
+    query = func.websearch_to_tsquery("simple", q)
+    rank = func.greatest(
+        func.ts_rank(Expense.search_vector, query),
+        func.word_similarity(q, Expense.description),
+    )
+    stmt = (
+        select(*READ_COLUMNS, rank.label("rank"))
+        .join(Category, Category.id == Expense.category_id)
+        .where(
+            Expense.user_id == user.id,
+            Expense.deleted_at.is_(None),
+            or_(
+                Expense.search_vector.op("@@")(query),
+                literal(q).op("<%")(Expense.description),
+            ),
+        )
+        .order_by(rank.desc(), Expense.id.desc())
+    )
+    if after:
+        stmt = stmt.where(tuple_(rank, Expense.id) < after)
+    return stmt
+
+
+# rows for /export and export jobs, oldest first
+def export_statement(
+    user: User,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    category_id: uuid.UUID | None,
+):
+    stmt = (
+        select(
+            Expense.id,
+            Expense.date,
+            Expense.amount,
+            Expense.description,
+            Category.name,
+            Expense.created_at,
+        )
+        .join(Category, Category.id == Expense.category_id)
+        .order_by(Expense.date, Expense.id)
+    )
+    return _filter_expenses(stmt, user, date_from, date_to, category_id)
+
+
+def _filter_expenses(
+    stmt,
+    user: User,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    category_id: uuid.UUID | None,
+):
+    stmt = stmt.where(Expense.user_id == user.id, Expense.deleted_at.is_(None))
+    # compare as dates so the planner can prune expense partitions
     if date_from:
-        stmt = stmt.where(Expense.date >= date_from)
+        stmt = stmt.where(Expense.date >= as_date(date_from))
     if date_to:
-        stmt = stmt.where(Expense.date <= date_to)
+        stmt = stmt.where(Expense.date <= as_date(date_to))
     if category_id:
         stmt = stmt.where(Expense.category_id == category_id)
+    return stmt
+
+
+def _encode_cursor(expense) -> str:
+    raw = json.dumps([expense.date.isoformat(), str(expense.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[date, uuid.UUID]:
+    try:
+        expense_date, expense_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return date.fromisoformat(expense_date), uuid.UUID(expense_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _encode_since(expense) -> str:
+    raw = json.dumps([expense.updated_at.isoformat(), str(expense.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
 
-    return session.exec(stmt).all()
+def _decode_since(since: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        updated_at, expense_id = json.loads(base64.urlsafe_b64decode(since))
+        return datetime.fromisoformat(updated_at), uuid.UUID(expense_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _encode_rank_cursor(row) -> str:
+    raw = json.dumps([row.rank, str(row.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_rank_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        rank, expense_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return float(rank), uuid.UUID(expense_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _stream_expenses(stmt, bind: AsyncEngine):
+    # own session so the server-side cursor outlives the request dependency
+    async with AsyncSession(bind) as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield b"".join(orjson.dumps(expense_row(row)) + b"\n" for row in rows)
 
 
 # get one expenses
 @router.get("/{id}")
-def get_expense(
+async def get_expense(
     id: uuid.UUID,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    return session.exec(
-        select(Expense).where(Expense.id == id, Expense.user_id == current_user.id)
+    return (
+        await session.exec(
+            select(Expense).where(
+                Expense.id == id,
+                Expense.user_id == current_user.id,
+                Expense.deleted_at.is_(None),
+            )
+        )
     ).first()
 
 
 # update expenses
 @router.put("/{id}")
-def update_expense(
+@query_budget(5)
+async def update_expense(
     id: uuid.UUID,
     amount: float | None = None,
     description: str | None = None,
     date: date | None = None,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    expense = session.exec(
-        select(Expense).where(Expense.id == id, Expense.user_id == current_user.id)
-    ).first()
-    if not expense:
-        raise HTTPException(status_code=404, detail="Expense not found")
+    now = await bump_data_version(session, current_user.id)
 
+    changes = {"updated_at": now}
     if amount:
-        expense.amount = amount
+        changes["amount"] = amount
     if description:
-        expense.description = description
+        changes["description"] = description
     if date:
-        expense.date = date
+        changes["date"] = date
+
+    # join the locked pre-update row so returning also sees the old values
+    # for the rollup
+    old = (
+        select(expenses.c.id, expenses.c.amount, expenses.c.date)
+        .where(
+            expenses.c.id == id,
+            expenses.c.user_id == current_user.id,
+            expenses.c.deleted_at.is_(None),
+        )
+        .with_for_update()
+        .subquery("old")
+    )
+    stmt = (
+        update(expenses)
+        .where(expenses.c.id == old.c.id)
+        .values(changes)
+        .returning(
+            *COLUMNS,
+            old.c.amount.label("old_amount"),
+            old.c.date.label("old_date"),
+        )
+    )
+
+    try:
+        row = (await session.execute(stmt)).first()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=RECURRING_DATE_TAKEN)
+    if not row:
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+    expense = {column.name: row._mapping[column] for column in COLUMNS}
+    old_key = (row.old_date, row.category_id)
+    new_key = (row.date, row.category_id)
+    if old_key == new_key:
+        deltas = {new_key: (row.amount - row.old_amount, 0)}
+    else:
+        deltas = {old_key: (-row.old_amount, -1), new_key: (row.amount, 1)}
 
-    session.add(expense)
-    session.commit()
-    session.refresh(expense)
+    await apply_deltas(session, current_user.id, deltas)
+    await session.commit()
     return expense
 
 
 # delete expenses
 @router.delete("/{id}")
-def delete_expense(
+@query_budget(5)
+async def delete_expense(
     id: uuid.UUID,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    expense = session.exec(
-        select(Expense).where(Expense.id == id, Expense.user_id == current_user.id)
-    ).first()
+    now = await bump_data_version(session, current_user.id)
+
+    # keep a tombstone so delta sync can report the delete
+    stmt = (
+        update(expenses)
+        .where(
+            expenses.c.id == id,
+            expenses.c.user_id == current_user.id,
+            expenses.c.deleted_at.is_(None),
+        )
+        .values(deleted_at=now, updated_at=now)
+        .returning(expenses.c.date, expenses.c.category_id, expenses.c.amount)
+    )
+
+    expense = (await session.execute(stmt)).first()
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    session.delete(expense)
-    session.commit()
+    await apply_deltas(
+        session,
+        current_user.id,
+        {(expense.date, expense.category_id): (-expense.amount, -1)},
+    )
+    await session.commit()
     return
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+STREAM_BATCH_SIZE = 5000
+
+HEADER = ("id", "date", "amount", "description", "category", "created_at")
+
+
+def file_type(format: str, compress: bool) -> tuple[str, str]:
+    filename = f"expenses.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return filename, media_type
+
+
+# stream rows from a server-side cursor straight into csv/ndjson chunks, one
+# chunk per fetched batch, without building models for each row
+async def export_rows(
+    stmt: Select,
+    format: str,
+    compress: bool,
+    bind: AsyncEngine,
+    on_batch: Callable[[int], Awaitable[None]] | None = None,
+) -> AsyncIterator[bytes]:
+    chunks = _encode(stmt, format, bind, on_batch)
+    if not compress:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    # wbits=31 writes a gzip container around the deflate stream
+    gzip = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = gzip.compress(chunk)
+        if data:
+            yield data
+    yield gzip.flush()
+
+
+async def _encode(
+    stmt: Select,
+    format: str,
+    bind: AsyncEngine,
+    on_batch: Callable[[int], Awaitable[None]] | None,
+) -> AsyncIterator[bytes]:
+    if format == "csv":
+        yield _csv_lines([HEADER])
+
+    # own session so the cursor outlives the request dependency
+    async with AsyncSession(bind) as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            if format == "csv":
+                yield _csv_lines(rows)
+            else:
+                yield _ndjson_lines(rows)
+            if on_batch:
+                await on_batch(len(rows))
+
+
+def _csv_lines(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _ndjson_lines(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(HEADER, row)), default=_json_default) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _json_default(value):
+    # dates and datetimes as iso strings, uuids as plain strings
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
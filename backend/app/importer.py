@@ -0,0 +1,166 @@
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import IO, Iterator
+
+from pydantic import ValidationError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Category
+from app.rollup import as_date
+from app.schemas import CreateExpense
+
+COLUMNS = (
+    "id",
+    "amount",
+    "description",
+    "category_id",
+    "user_id",
+    "date",
+    "created_at",
+    "updated_at",
+)
+# rows read, parsed and validated per trip to a worker thread
+PARSE_BATCH_SIZE = 1000
+# errors past this many are only counted, so a garbage upload can't build a
+# response as large as itself
+MAX_REPORTED_ERRORS = 100
+
+
+# yields (row number, row); ndjson rows stay raw so one bad line can't stop
+# the rest of the upload
+def _read_rows(file: IO[bytes], format: str) -> Iterator[tuple[int, dict | str]]:
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    if format == "csv":
+        yield from enumerate(csv.DictReader(text), start=1)
+        return
+
+    rows = (line for line in text if line.strip())
+    yield from enumerate(rows, start=1)
+
+
+# the next batch of (row number, expense, error), read from the spooled
+# upload in a worker thread so file reads and parsing stay off the event loop
+def _parse_batch(rows, by_name, owned) -> list[tuple]:
+    return [
+        (number, *_validate(row, by_name, owned))
+        for number, row in islice(rows, PARSE_BATCH_SIZE)
+    ]
+
+
+# load expenses from a csv/ndjson upload with COPY, in the session's
+# transaction. valid rows are imported, invalid ones are counted and the first
+# MAX_REPORTED_ERRORS come back as errors
+async def import_expenses(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    file: IO[bytes],
+    format: str,
+    now: datetime,
+) -> tuple[int, int, list[dict]]:
+    # resolve category names to ids once instead of per row
+    categories = (
+        await session.exec(select(Category).where(Category.user_id == user_id))
+    ).all()
+    by_name = {category.name: category.id for category in categories}
+    owned = set(by_name.values())
+
+    conn = await session.connection()
+    raw = (await conn.get_raw_connection()).driver_connection
+
+    imported = 0
+    failed = 0
+    errors: list[dict] = []
+
+    async with raw.cursor() as cur:
+        # stage rows so the rollup can be updated from the same data
+        await cur.execute(
+            "CREATE TEMP TABLE expense_import "
+            "(LIKE expenses INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+
+        async with cur.copy(
+            f"COPY expense_import ({', '.join(COLUMNS)}) FROM STDIN"
+        ) as copy:
+            rows = _read_rows(file, format)
+            while batch := await asyncio.to_thread(
+                _parse_batch, rows, by_name, owned
+            ):
+                for number, expense, error in batch:
+                    if error:
+                        failed += 1
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append({"row": number, "error": error})
+                        continue
+
+                    # psycopg buffers rows and flushes them in large chunks
+                    await copy.write_row(
+                        (
+                            uuid.uuid4(),
+                            expense.amount,
+                            expense.description,
+                            expense.category_id,
+                            user_id,
+                            as_date(expense.date),
+                            now,
+                            now,
+                        )
+                    )
+                    imported += 1
+
+        await cur.execute(
+            f"INSERT INTO expenses ({', '.join(COLUMNS)}) "
+            f"SELECT {', '.join(COLUMNS)} FROM expense_import"
+        )
+        await cur.execute(
+            """
+            INSERT INTO daily_spend (user_id, date, category_id, total, count)
+            SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+            FROM expense_import
+            GROUP BY user_id, date, category_id
+            ON CONFLICT (user_id, date, category_id) DO UPDATE
+            SET total = daily_spend.total + excluded.total,
+                count = daily_spend.count + excluded.count
+            """
+        )
+
+    return imported, failed, errors
+
+
+def _validate(
+    row: dict | str, by_name: dict[str, uuid.UUID], owned: set[uuid.UUID]
+) -> tuple[CreateExpense | None, str | None]:
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            return None, "Invalid JSON"
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+
+    row = {key: value for key, value in row.items() if value not in ("", None)}
+
+    name = row.pop("category", None)
+    if name is not None and "category_id" not in row:
+        if not isinstance(name, str):
+            return None, "category: Input should be a valid string"
+        if name not in by_name:
+            return None, f"Category not found: {name}"
+        row["category_id"] = by_name[name]
+
+    try:
+        expense = CreateExpense.model_validate(row)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+        )
+
+    if expense.category_id not in owned:
+        return None, "Category not found"
+
+    return expense, None
@@ -0,0 +1,315 @@
+import asyncio
+import contextvars
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy import delete, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import exporter
+from app.config import settings
+from app.db import get_session, job_engine
+from app.deps import get_current_user
+from app.expenses import export_statement
+from app.models import Job, User
+from app.rollup import backfill
+from app.schemas import JobRead
+from app.versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+PENDING = ("queued", "running")
+FINISHED = ("done", "failed")
+
+
+# runs jobs as tasks in this process, at most JOB_CONCURRENCY at a time. jobs
+# use job_engine, so they never wait on or hold the request pool
+class JobRunner:
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks: set[asyncio.Task] = set()
+
+    def submit(self, job_id: uuid.UUID):
+        # a fresh context keeps the job's queries out of the submitting
+        # request's timings
+        task = asyncio.create_task(self._run(job_id), context=contextvars.Context())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, job_id: uuid.UUID):
+        try:
+            # counted from submission, so no live job outlasts the timeout
+            async with asyncio.timeout(settings.JOB_TIMEOUT_SECONDS):
+                async with self.semaphore:
+                    async with AsyncSession(job_engine) as session:
+                        job = await session.get(Job, job_id)
+                    await _update(job_id, status="running", started_at=datetime.now())
+                    result_path = await HANDLERS[job.kind](job)
+        except TimeoutError:
+            await _update(
+                job_id, status="failed", error="timed out", finished_at=datetime.now()
+            )
+        except asyncio.CancelledError:
+            await _update(
+                job_id, status="failed", error="interrupted", finished_at=datetime.now()
+            )
+            raise
+        except Exception as e:
+            logger.exception("job %s failed", job_id)
+            await _update(
+                job_id, status="failed", error=str(e), finished_at=datetime.now()
+            )
+        else:
+            await _update(
+                job_id,
+                status="done",
+                progress=1,
+                result_path=result_path,
+                finished_at=datetime.now(),
+            )
+
+    # jobs still queued or running on shutdown are marked failed, clients
+    # resubmit them
+    async def shutdown(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+runner = JobRunner(settings.JOB_CONCURRENCY)
+
+
+async def _update(job_id: uuid.UUID, **values):
+    async with AsyncSession(job_engine) as session:
+        await session.execute(update(Job).where(Job.id == job_id).values(**values))
+        await session.commit()
+
+
+# pending jobs older than JOB_TIMEOUT_SECONDS belong to a process that died
+# without marking them, a live runner would have timed them out already.
+# marks them failed for every user on startup, or for one user on submit
+async def fail_stale_jobs(session: AsyncSession, user_id: uuid.UUID | None = None):
+    cutoff = datetime.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    stmt = (
+        update(Job)
+        .where(Job.status.in_(PENDING), Job.created_at < cutoff)
+        .values(status="failed", error="interrupted", finished_at=datetime.now())
+    )
+    if user_id:
+        stmt = stmt.where(Job.user_id == user_id)
+    await session.execute(stmt)
+
+
+async def fail_stale_on_startup():
+    async with AsyncSession(job_engine) as session:
+        await fail_stale_jobs(session)
+        await session.commit()
+
+
+# deletes finished jobs older than JOB_RETENTION_SECONDS, then their result
+# files. a failed commit leaves the rows and their files in place
+async def expire_jobs() -> int:
+    cutoff = datetime.now() - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+    async with AsyncSession(job_engine) as session:
+        paths = (
+            await session.execute(
+                delete(Job)
+                .where(Job.status.in_(FINISHED), Job.finished_at < cutoff)
+                .returning(Job.result_path)
+            )
+        ).scalars().all()
+        await session.commit()
+
+    for path in paths:
+        if path:
+            await asyncio.to_thread(Path(path).unlink, missing_ok=True)
+    return len(paths)
+
+
+# sweeps for expired jobs every JOB_CLEANUP_INTERVAL_SECONDS until cancelled
+async def expire_forever():
+    while True:
+        try:
+            expired = await expire_jobs()
+            if expired:
+                logger.info("deleted %d expired jobs", expired)
+        except Exception:
+            logger.exception("job cleanup failed")
+        await asyncio.sleep(settings.JOB_CLEANUP_INTERVAL_SECONDS)
+
+
+# writes the export to JOB_RESULTS_DIR, progress follows the fetched batches
+async def run_export(job: Job) -> str:
+    params = job.params
+    async with AsyncSession(job_engine) as session:
+        user = await session.get(User, job.user_id)
+        stmt = export_statement(
+            user,
+            _parse_datetime(params["date_from"]),
+            _parse_datetime(params["date_to"]),
+            uuid.UUID(params["category_id"]) if params["category_id"] else None,
+        )
+        total = (
+            await session.execute(select(func.count()).select_from(stmt.subquery()))
+        ).scalar_one()
+
+    done = 0
+
+    async def on_batch(rows: int):
+        nonlocal done
+        done += rows
+        await _update(job.id, progress=min(done / total, 1) if total else 1)
+
+    filename, _ = exporter.file_type(params["format"], params["gzip"])
+    path = settings.JOB_RESULTS_DIR / f"{job.id}-{filename}"
+    partial = path.with_name(path.name + ".partial")
+    settings.JOB_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    chunks = exporter.export_rows(
+        stmt, params["format"], params["gzip"], job_engine, on_batch
+    )
+    # file writes go to a thread so a slow disk never stalls the event loop
+    f = await asyncio.to_thread(open, partial, "wb")
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    finally:
+        await asyncio.to_thread(f.close)
+    os.replace(partial, path)
+    return str(path)
+
+
+# rebuilds the user's daily_spend rollup. the version bump drops their cached
+# analytics, and its row lock keeps new writes out until the rebuild commits
+async def run_rollup(job: Job) -> None:
+    async with AsyncSession(job_engine) as session:
+        await bump_data_version(session, job.user_id)
+        await backfill(session, job.user_id)
+        await session.commit()
+
+
+HANDLERS = {"export": run_export, "rollup": run_rollup}
+
+
+def _parse_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _job_read(job: Job) -> JobRead:
+    result_url = None
+    if job.status == "done" and job.result_path:
+        result_url = f"/jobs/{job.id}/result"
+    return JobRead(**job.model_dump(), result_url=result_url)
+
+
+async def _submit(
+    session: AsyncSession, user: User, kind: str, params: dict
+) -> JobRead:
+    # the user's row lock serializes their submits, so two can't both pass
+    # the count. no key update leaves the jobs foreign key check unblocked
+    await session.execute(
+        select(User.id).where(User.id == user.id).with_for_update(key_share=True)
+    )
+    await fail_stale_jobs(session, user.id)
+    pending = (
+        await session.exec(
+            select(func.count())
+            .select_from(Job)
+            .where(Job.user_id == user.id, Job.status.in_(PENDING))
+        )
+    ).one()
+    if pending >= settings.JOB_MAX_PENDING_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pending jobs",
+        )
+
+    job = Job(user_id=user.id, kind=kind, params=params)
+    session.add(job)
+    await session.commit()
+    runner.submit(job.id)
+    return _job_read(job)
+
+
+# same filters as /expenses/export, the file is downloaded from result_url
+@router.post(
+    "/export", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_export(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    category_id: uuid.UUID | None = None,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    params = {
+        "format": format,
+        "gzip": gzip,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "category_id": str(category_id) if category_id else None,
+    }
+    return await _submit(session, current_user, "export", params)
+
+
+# rebuild the caller's analytics rollup from their expenses
+@router.post(
+    "/rollup", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_rollup(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return await _submit(session, current_user, "rollup", {})
+
+
+async def _get_job(session: AsyncSession, id: uuid.UUID, user: User) -> Job:
+    job = (
+        await session.exec(select(Job).where(Job.id == id, Job.user_id == user.id))
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# poll a job's status and progress
+@router.get("/{id}", response_model=JobRead)
+async def get_job(
+    id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    return _job_read(await _get_job(session, id, current_user))
+
+
+# download a finished job's result
+@router.get("/{id}/result")
+async def get_job_result(
+    id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    job = await _get_job(session, id, current_user)
+    if job.status != "done" or not job.result_path:
+        raise HTTPException(status_code=409, detail="Job has no result yet")
+    if not os.path.exists(job.result_path):
+        raise HTTPException(status_code=410, detail="Job result is gone")
+
+    filename, media_type = exporter.file_type(
+        job.params["format"], job.params["gzip"]
+    )
+    return FileResponse(job.result_path, media_type=media_type, filename=filename)
@@ -1,9 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app import analytics, auth, categories, expenses,users
+from app import (
+    analytics,
+    auth,
+    categories,
+    expenses,
+    jobs,
+    partitions,
+    profiler,
+    recurring,
+    users,
+)
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.db import get_pool_status
+from app.metrics import MetricsMiddleware, render_metrics
+from app.security import password_hasher
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await partitions.ensure_on_startup()
+    await jobs.fail_stale_on_startup()
+    password_hasher.start()
+    tasks = []
+    if settings.RECURRING_INTERVAL_SECONDS:
+        tasks.append(asyncio.create_task(recurring.run_forever()))
+    if settings.JOB_CLEANUP_INTERVAL_SECONDS:
+        tasks.append(asyncio.create_task(jobs.expire_forever()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await jobs.runner.shutdown()
+    password_hasher.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,13 +48,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# compresses json and ndjson responses for clients that accept gzip, gzipped
+# exports go out as they are
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
+if profiler.enabled():
+    profiler.install()
+    app.add_middleware(profiler.ProfilerMiddleware)
+# outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth.router)
 app.include_router(categories.router)
 app.include_router(expenses.router)
 app.include_router(analytics.router)
 app.include_router(users.router)
+app.include_router(recurring.router)
+app.include_router(jobs.router)
 
 
 @app.get("/health")
 def health():
     return
+
+
+@app.get("/health/pool")
+def pool_health():
+    return get_pool_status()
+
+
+# prometheus text format, counters are per worker process
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4"
+    )
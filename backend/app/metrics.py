@@ -0,0 +1,224 @@
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.cache import analytics_cache, principal_cache, recent_writers
+from app.db import engines, get_pool_status
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...], buckets: tuple
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # per label set: bucket counts, then +Inf, sum and count
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float):
+        counts = self.values.setdefault(labels, [0] * (len(self.buckets) + 3))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-3] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self.values.items():
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                le = _labels((*self.labels, "le"), (*labels, bound))
+                lines.append(f"{self.name}_bucket{le} {count}")
+            names = _labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{names} {counts[-2]}")
+            lines.append(f"{self.name}_count{names} {counts[-1]}")
+        return lines
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+requests_total = Counter(
+    "http_requests_total",
+    "Requests by route and status",
+    ("method", "route", "status"),
+)
+request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements run per request",
+    ("method", "route"),
+    QUERY_BUCKETS,
+)
+queries_total = Counter("db_queries_total", "SQL statements executed")
+query_seconds_total = Counter("db_query_seconds_total", "Time spent in SQL")
+in_flight = 0
+
+
+# timings for the request being handled, shared by the middleware, the
+# cursor events and anything that wraps a block in timing()
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.spans: dict[str, float] = {}
+        # statement text -> executions, filled in when the profiler is on
+        self.statements: StatementCounter[str] = StatementCounter()
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def timing(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add(name, time.perf_counter() - start)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    queries_total.inc()
+    query_seconds_total.inc(amount=seconds)
+
+    timings = current_timings.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.add("db", seconds)
+
+
+# replica statements count towards the same totals as the primary's
+for bind in engines:
+    event.listen(bind.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(bind.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+# pure ASGI so streaming responses pass through untouched. records latency,
+# status and query counts per route template and adds a Server-Timing header
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        global in_flight
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings.add("total", time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(timings).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            in_flight -= 1
+            current_timings.reset(token)
+
+            # the router stores the matched route in the scope, templates keep
+            # label cardinality bounded
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            requests_total.inc((*labels, str(status)))
+            request_seconds.observe(labels, time.perf_counter() - start)
+            request_queries.observe(labels, timings.queries)
+
+
+def _server_timing(timings: RequestTimings) -> str:
+    entries = []
+    for name, seconds in timings.spans.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{timings.queries} queries"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in (
+        requests_total,
+        request_seconds,
+        request_queries,
+        queries_total,
+        query_seconds_total,
+    ):
+        lines.extend(metric.render())
+
+    lines.append("# TYPE http_requests_in_flight gauge")
+    lines.append(f"http_requests_in_flight {in_flight}")
+
+    for name, value in get_pool_status().items():
+        lines.append(f"db_pool_{name} {value}")
+
+    for cache_name, cache in (
+        ("analytics", analytics_cache),
+        ("principal", principal_cache),
+        ("recent_writers", recent_writers),
+    ):
+        for name, value in cache.stats().items():
+            lines.append(f'cache_{name}{{cache="{cache_name}"}} {value}')
+
+    return "\n".join(lines) + "\n"
@@ -2,6 +2,8 @@ import uuid
 from datetime import date, datetime
 from typing import TYPE_CHECKING, List, Optional
 
+from sqlalchemy import JSON, Column, Computed, Index, PrimaryKeyConstraint, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -10,17 +12,69 @@ if TYPE_CHECKING:
 
 class Expense(SQLModel, table=True):
     __tablename__ = "expenses"
-
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (
+        # partitions need the partition key in the primary key
+        PrimaryKeyConstraint("id", "date"),
+        # covers keyset pages and per-user date ranges without heap lookups.
+        # tombstones are left out, every query it serves skips them anyway
+        Index(
+            "ix_expenses_user_id_date_id",
+            "user_id",
+            "date",
+            "id",
+            postgresql_include=["amount", "category_id"],
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_expenses_category_id_date_id", "category_id", "date", "id"),
+        # delta sync walks a user's changes in (updated_at, id) order
+        Index("ix_expenses_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        # btree_gin lets both search indexes lead with user_id
+        Index(
+            "ix_expenses_user_id_search_vector",
+            "user_id",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_expenses_user_id_description_trgm",
+            "user_id",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        # a recurring rule writes each occurrence at most once
+        Index("ix_expenses_recurring_id_date", "recurring_id", "date", unique=True),
+        # one partition per year, see app/partitions.py
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
 
     amount: float
     description: str | None
 
-    category_id: uuid.UUID = Field(foreign_key="categories.id", index=True)
-    user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
+    category_id: uuid.UUID = Field(foreign_key="categories.id")
+    user_id: uuid.UUID = Field(foreign_key="users.id")
 
     date: date
     created_at: datetime = Field(default_factory=datetime.now, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.now, nullable=False)
+    # deleted rows are kept as tombstones so delta sync can report them
+    deleted_at: datetime | None = None
+    # set on expenses written by a recurring rule
+    recurring_id: uuid.UUID | None = Field(
+        default=None, foreign_key="recurring_expenses.id", ondelete="SET NULL"
+    )
+
+    # maintained by postgres, only used for search
+    search_vector: str | None = Field(
+        default=None,
+        exclude=True,
+        sa_column=Column(
+            TSVECTOR,
+            Computed("to_tsvector('simple', coalesce(description, ''))"),
+        ),
+    )
 
     category: Optional["Category"] = Relationship(back_populates="expenses")
 
@@ -29,7 +83,7 @@ class Category(SQLModel, table=True):
     __tablename__ = "categories"
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    user_id: uuid.UUID = Field(foreign_key="users.id")
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
 
     name: str
     color: str
@@ -49,3 +103,70 @@ class User(SQLModel, table=True):
     full_name: str | None = None
 
     disabled: bool = False
+
+    # bumped by every write to the user's expenses or categories
+    data_version: int = 0
+    # bumped when the user is disabled, re-enabled or renamed. tokens carry
+    # the version they were issued at, older ones are rejected
+    token_version: int = 0
+
+
+class DailySpend(SQLModel, table=True):
+    __tablename__ = "daily_spend"
+    __table_args__ = (PrimaryKeyConstraint("user_id", "date", "category_id"),)
+
+    user_id: uuid.UUID = Field(foreign_key="users.id")
+    date: date
+    category_id: uuid.UUID = Field(foreign_key="categories.id")
+
+    total: float = 0
+    count: int = 0
+
+
+class RecurringExpense(SQLModel, table=True):
+    __tablename__ = "recurring_expenses"
+    # the scheduler walks due rules in (next_date, id) order
+    __table_args__ = (Index("ix_recurring_expenses_next_date_id", "next_date", "id"),)
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
+    category_id: uuid.UUID = Field(foreign_key="categories.id")
+
+    amount: float
+    description: str | None = None
+
+    # an RRULE subset: FREQ, INTERVAL, UNTIL and COUNT from start_date
+    freq: str
+    interval: int = 1
+    start_date: date
+    until: date | None = None
+    count: int | None = None
+
+    # occurrences written so far and the date of the next one, None once the
+    # schedule has ended
+    materialized: int = 0
+    next_date: date | None = None
+
+    created_at: datetime = Field(default_factory=datetime.now, nullable=False)
+
+
+class Job(SQLModel, table=True):
+    __tablename__ = "jobs"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
+
+    kind: str
+    # queued, running, done or failed
+    status: str = "queued"
+    params: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    # fraction of the work done, 0 to 1
+    progress: float = 0
+
+    # file under JOB_RESULTS_DIR, for jobs that produce one
+    result_path: str | None = None
+    error: str | None = None
+
+    created_at: datetime = Field(default_factory=datetime.now, nullable=False)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import re
+import uuid
+from datetime import date
+
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.db import engine
+from app.models import Category, Expense
+
+# expenses is range partitioned by date, one partition per year named
+# expenses_p<year>. rows outside every year land in expenses_default
+DEFAULT_PARTITION = "expenses_default"
+ARCHIVE_SCHEMA = "archive"
+PARTITION_NAME = re.compile(r"^expenses_p(\d{4})$")
+# pg_advisory_xact_lock key, so workers starting together don't race
+LOCK_KEY = 0x65787061
+
+# the generated search_vector column is recomputed on insert
+COLUMNS = ", ".join(c.name for c in Expense.__table__.c if c.computed is None)
+
+
+def partition_name(year: int) -> str:
+    return f"expenses_p{year}"
+
+
+async def is_partitioned(session: AsyncSession) -> bool:
+    if session.bind.dialect.name != "postgresql":
+        return False
+    result = await session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('expenses'))"
+        )
+    )
+    return result.scalar()
+
+
+# years with a partition attached to expenses
+async def partition_years(session: AsyncSession) -> list[int]:
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('expenses')"
+        )
+    )
+    years = []
+    for (name,) in result:
+        match = PARTITION_NAME.match(name)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+
+# create partitions for this year and the next few, plus any year that has
+# rows sitting in the default partition. returns the years created
+async def ensure_partitions(
+    session: AsyncSession, years_ahead: int | None = None
+) -> list[int]:
+    if years_ahead is None:
+        years_ahead = settings.EXPENSE_PARTITION_YEARS_AHEAD
+
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+    )
+
+    this_year = date.today().year
+    wanted = set(range(this_year, this_year + years_ahead + 1))
+    stranded = await session.execute(
+        text(f"SELECT DISTINCT extract(year FROM date)::int FROM {DEFAULT_PARTITION}")
+    )
+    wanted.update(year for (year,) in stranded)
+
+    missing = sorted(wanted - set(await partition_years(session)))
+    for year in missing:
+        await _create_partition(session, year)
+    return missing
+
+
+# postgres refuses to attach a partition while the default partition holds
+# rows for its range, so those rows are moved out and back in around it
+async def _create_partition(session: AsyncSession, year: int):
+    bounds = {"start": date(year, 1, 1), "end": date(year + 1, 1, 1)}
+
+    await session.execute(text("CREATE TEMP TABLE expenses_moving (LIKE expenses)"))
+    await session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE date >= :start AND date < :end RETURNING *) "
+            "INSERT INTO expenses_moving SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    await session.execute(
+        text(
+            f"CREATE TABLE {partition_name(year)} PARTITION OF expenses "
+            f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+        )
+    )
+    await session.execute(
+        text(f"INSERT INTO expenses ({COLUMNS}) SELECT {COLUMNS} FROM expenses_moving")
+    )
+    await session.execute(text("DROP TABLE expenses_moving"))
+
+
+# detach every yearly partition before a year and move it to the archive
+# schema, or drop it. archived rows disappear without tombstones, so their
+# rollup rows are removed and the owners' data versions bumped
+async def detach_partitions(
+    session: AsyncSession, before: int, drop: bool = False
+) -> list[str]:
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+    )
+    await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+    detached = []
+    for year in await partition_years(session):
+        if year >= before:
+            continue
+        name = partition_name(year)
+        bounds = {"start": date(year, 1, 1), "end": date(year + 1, 1, 1)}
+
+        await session.execute(
+            text(
+                "UPDATE users SET data_version = data_version + 1 "
+                f"WHERE id IN (SELECT DISTINCT user_id FROM {name})"
+            )
+        )
+        await session.execute(
+            text("DELETE FROM daily_spend WHERE date >= :start AND date < :end"),
+            bounds,
+        )
+        # CONCURRENTLY isn't allowed while a default partition exists
+        await session.execute(text(f"ALTER TABLE expenses DETACH PARTITION {name}"))
+        if drop:
+            await session.execute(text(f"DROP TABLE {name}"))
+        else:
+            await session.execute(
+                text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            )
+        detached.append(name)
+    return detached
+
+
+# partitions the expense list query scans for a date range, read from its plan
+async def scanned_partitions(
+    session: AsyncSession, user_id: uuid.UUID, date_from: date, date_to: date
+) -> list[str]:
+    stmt = (
+        select(Expense.id)
+        .join(Category, Category.id == Expense.category_id)
+        .where(
+            Expense.user_id == user_id,
+            Expense.deleted_at.is_(None),
+            Expense.date >= date_from,
+            Expense.date <= date_to,
+        )
+        .order_by(Expense.date.desc(), Expense.id.desc())
+        .limit(51)
+    )
+    sql = stmt.compile(
+        dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = (await session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    relations = set()
+
+    def walk(node: dict):
+        if node.get("Relation Name", "").startswith("expenses"):
+            relations.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return sorted(relations)
+
+
+# creates upcoming partitions on startup, a no-op until the migration has run
+async def ensure_on_startup():
+    async with AsyncSession(engine) as session:
+        if not await is_partitioned(session):
+            return
+        await ensure_partitions(session)
+        await session.commit()
+
+
+async def main(args):
+    async with AsyncSession(engine) as session:
+        if args.command == "ensure":
+            created = await ensure_partitions(session, args.years_ahead)
+            print(f"created: {', '.join(map(partition_name, created)) or 'nothing'}")
+        elif args.command == "detach":
+            detached = await detach_partitions(session, args.before, args.drop)
+            print(f"detached: {', '.join(detached) or 'nothing'}")
+        else:
+            scanned = await scanned_partitions(
+                session, args.user_id, args.date_from, args.date_to
+            )
+            print(f"scanned: {', '.join(scanned)}")
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage expense partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="create upcoming partitions")
+    ensure.add_argument("--years-ahead", type=int, default=None)
+
+    detach = commands.add_parser("detach", help="archive old partitions")
+    detach.add_argument("--before", type=int, required=True, help="first year kept")
+    detach.add_argument("--drop", action="store_true", help="drop, don't archive")
+
+    check = commands.add_parser("check-pruning", help="show scanned partitions")
+    check.add_argument("--user-id", type=uuid.UUID, default=uuid.UUID(int=0))
+    check.add_argument("--date-from", type=date.fromisoformat, required=True)
+    check.add_argument("--date-to", type=date.fromisoformat, required=True)
+
+    args = parser.parse_args()
+    asyncio.run(main(args))
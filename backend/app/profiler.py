@@ -0,0 +1,134 @@
+import logging
+import time
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db import engines
+from app.metrics import current_timings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# caps the statements one request to this route may run, checked by
+# ProfilerMiddleware when DB_QUERY_BUDGET or a per-route budget is set
+def query_budget(limit: int):
+    def decorate(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+
+    return decorate
+
+
+def enabled() -> bool:
+    return (
+        settings.DB_SLOW_QUERY_MS is not None
+        or settings.DB_N_PLUS_ONE_THRESHOLD is not None
+        or settings.DB_QUERY_BUDGET is not None
+        or settings.DB_QUERY_BUDGET_STRICT
+    )
+
+
+def install():
+    for bind in engines:
+        event.listen(bind.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(bind.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["profile_start"].pop()) * 1000
+
+    # bound parameters are kept out of the shape, so a loop issuing the same
+    # statement for different ids counts as one shape
+    timings = current_timings.get()
+    if timings is not None:
+        timings.statements[statement] += 1
+
+    if settings.DB_SLOW_QUERY_MS is None or elapsed_ms < settings.DB_SLOW_QUERY_MS:
+        return
+
+    plan = None
+    if settings.DB_EXPLAIN_SLOW_QUERIES and not executemany:
+        plan = _explain(conn, statement, parameters)
+
+    logger.warning(
+        "slow query (%.1f ms): %s\nparameters: %r%s",
+        elapsed_ms,
+        statement,
+        parameters,
+        f"\nplan:\n{plan}" if plan else "",
+    )
+
+
+# EXPLAIN ANALYZE runs the statement again, so only plain SELECTs are
+# explained: a WITH can hide an INSERT, UPDATE or DELETE. a separate cursor
+# keeps the original result set intact, and the savepoint keeps a failed
+# EXPLAIN from aborting the request's transaction
+def _explain(conn, statement: str, parameters) -> str | None:
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+
+    cursor = conn.connection.cursor()
+    savepoint = False
+    try:
+        cursor.execute("SAVEPOINT profiler_explain")
+        savepoint = True
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        cursor.execute("RELEASE SAVEPOINT profiler_explain")
+        return plan
+    except Exception as e:
+        if savepoint:
+            cursor.execute("ROLLBACK TO SAVEPOINT profiler_explain")
+        return f"explain failed: {e}"
+    finally:
+        cursor.close()
+
+
+# reports repeated statement shapes and enforces query budgets once the
+# request is done. sits inside MetricsMiddleware, which owns the timings
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+        timings = current_timings.get()
+        if timings is None:
+            return
+
+        route = scope.get("route")
+        name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+        threshold = settings.DB_N_PLUS_ONE_THRESHOLD
+        if threshold is not None:
+            for statement, count in timings.statements.items():
+                if count >= threshold:
+                    logger.warning(
+                        "possible N+1 in %s: statement ran %d times: %s",
+                        name,
+                        count,
+                        statement,
+                    )
+
+        budget = getattr(
+            getattr(route, "endpoint", None), "query_budget", settings.DB_QUERY_BUDGET
+        )
+        if budget is not None and timings.queries > budget:
+            message = f"{name} ran {timings.queries} queries, budget is {budget}"
+            if settings.DB_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import calendar
+import logging
+import uuid
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, tuple_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.db import get_session, scheduler_engine
+from app.deps import get_current_user, get_read_session
+from app.models import Category, RecurringExpense, User
+from app.schemas import RecurringExpenseRequest
+from app.versions import bump_data_version, db_now
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/recurring", tags=["recurring"])
+
+COLUMNS = (
+    "id",
+    "amount",
+    "description",
+    "category_id",
+    "user_id",
+    "date",
+    "created_at",
+    "updated_at",
+    "recurring_id",
+)
+# rules locked and materialized per transaction
+RULE_BATCH_SIZE = 1000
+# occurrences one rule may add per pass, a long catch-up continues next pass
+MAX_CATCH_UP = 400
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+# counted from start_date rather than the previous occurrence, so a rule on
+# the 31st goes back to the 31st after a short month
+def occurrence(rule: RecurringExpense, index: int) -> date:
+    steps = index * rule.interval
+    if rule.freq == "daily":
+        return rule.start_date + timedelta(days=steps)
+    if rule.freq == "weekly":
+        return rule.start_date + timedelta(weeks=steps)
+    if rule.freq == "monthly":
+        return add_months(rule.start_date, steps)
+    return add_months(rule.start_date, 12 * steps)
+
+
+def next_occurrence(rule: RecurringExpense, index: int) -> date | None:
+    if rule.count is not None and index >= rule.count:
+        return None
+    day = occurrence(rule, index)
+    if rule.until is not None and day > rule.until:
+        return None
+    return day
+
+
+# dates due by today, plus the rule's position after writing them
+def due_occurrences(
+    rule: RecurringExpense, today: date
+) -> tuple[list[date], int, date | None]:
+    dates = []
+    index = rule.materialized
+    day = next_occurrence(rule, index)
+    while day is not None and day <= today and len(dates) < MAX_CATCH_UP:
+        dates.append(day)
+        index += 1
+        day = next_occurrence(rule, index)
+    return dates, index, day
+
+
+# write the rules' due occurrences with COPY and one insert, in the session's
+# transaction. occurrences already in expenses are skipped, so a retried or
+# overlapping pass never duplicates them. returns the expenses written
+async def materialize(
+    session: AsyncSession,
+    rules: list[RecurringExpense],
+    today: date,
+    now: datetime,
+) -> int:
+    conn = await session.connection()
+    raw = (await conn.get_raw_connection()).driver_connection
+
+    positions = []
+    async with raw.cursor() as cur:
+        await cur.execute(
+            "CREATE TEMP TABLE recurring_stage "
+            "(LIKE expenses INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+
+        async with cur.copy(
+            f"COPY recurring_stage ({', '.join(COLUMNS)}) FROM STDIN"
+        ) as copy:
+            for rule in rules:
+                dates, index, next_date = due_occurrences(rule, today)
+                for day in dates:
+                    await copy.write_row(
+                        (
+                            uuid.uuid4(),
+                            rule.amount,
+                            rule.description,
+                            rule.category_id,
+                            rule.user_id,
+                            day,
+                            now,
+                            now,
+                            rule.id,
+                        )
+                    )
+                positions.append(
+                    {"id": rule.id, "materialized": index, "next_date": next_date}
+                )
+
+        # only rows that were actually inserted reach the rollup
+        await cur.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO expenses ({', '.join(COLUMNS)})
+                SELECT {', '.join(COLUMNS)} FROM recurring_stage
+                ON CONFLICT (recurring_id, date) DO NOTHING
+                RETURNING user_id, date, category_id, amount
+            ), rolled_up AS (
+                INSERT INTO daily_spend (user_id, date, category_id, total, count)
+                SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+                FROM inserted
+                GROUP BY user_id, date, category_id
+                ON CONFLICT (user_id, date, category_id) DO UPDATE
+                SET total = daily_spend.total + excluded.total,
+                    count = daily_spend.count + excluded.count
+            )
+            SELECT COUNT(*) FROM inserted
+            """
+        )
+        (written,) = await cur.fetchone()
+
+    await session.execute(update(RecurringExpense), positions)
+    return written
+
+
+# one scheduler pass over every due rule, a batch per transaction. rules are
+# fetched by keyset on (next_date, id) so memory stays bounded however many
+# there are, and SKIP LOCKED lets passes from several processes share the work
+async def run_pass(today: date | None = None) -> int:
+    today = today or date.today()
+    written = 0
+    after = None
+
+    while True:
+        async with AsyncSession(scheduler_engine) as session:
+            stmt = (
+                select(RecurringExpense)
+                .where(RecurringExpense.next_date <= today)
+                .order_by(RecurringExpense.next_date, RecurringExpense.id)
+                .limit(RULE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            if after:
+                stmt = stmt.where(
+                    tuple_(RecurringExpense.next_date, RecurringExpense.id) > after
+                )
+            rules = (await session.exec(stmt)).all()
+            if not rules:
+                break
+            after = (rules[-1].next_date, rules[-1].id)
+
+            # bump the owners' data versions first, like every other write.
+            # locking in id order keeps concurrent passes from deadlocking.
+            # no key update is all the bump needs, and unlike for update it
+            # doesn't block foreign key checks on the users' inserts
+            user_ids = sorted({rule.user_id for rule in rules})
+            await session.execute(
+                select(User.id)
+                .where(User.id.in_(user_ids))
+                .order_by(User.id)
+                .with_for_update(key_share=True)
+            )
+            stamped = await session.execute(
+                update(User)
+                .where(User.id.in_(user_ids))
+                .values(data_version=User.data_version + 1)
+                .returning(db_now())
+            )
+
+            now = max(stamped.scalars())
+            written += await materialize(session, rules, today, now)
+            await session.commit()
+
+    return written
+
+
+# runs a pass every RECURRING_INTERVAL_SECONDS until cancelled
+async def run_forever():
+    while True:
+        try:
+            written = await run_pass()
+            if written:
+                logger.info("materialized %d recurring expenses", written)
+        except Exception:
+            logger.exception("recurring expense pass failed")
+        await asyncio.sleep(settings.RECURRING_INTERVAL_SECONDS)
+
+
+# list recurring rules
+@router.get("/")
+async def get_recurring(
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+):
+    stmt = (
+        select(RecurringExpense)
+        .where(RecurringExpense.user_id == current_user.id)
+        .order_by(RecurringExpense.created_at)
+    )
+    return (await session.exec(stmt)).all()
+
+
+# add a rule, occurrences already due are written right away
+@router.post("/")
+async def create_recurring(
+    data: RecurringExpenseRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    now = await bump_data_version(session, current_user.id)
+
+    category = (
+        await session.exec(
+            select(Category.id).where(
+                Category.id == data.category_id,
+                Category.user_id == current_user.id,
+            )
+        )
+    ).first()
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    rule = RecurringExpense(**data.model_dump(), user_id=current_user.id)
+    rule.next_date = next_occurrence(rule, 0)
+    session.add(rule)
+    await session.flush()
+
+    await materialize(session, [rule], date.today(), now)
+    await session.commit()
+    await session.refresh(rule)
+    return rule
+
+
+# delete a rule, expenses it already wrote are kept
+@router.delete("/{id}")
+async def delete_recurring(
+    id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    result = await session.execute(
+        delete(RecurringExpense).where(
+            RecurringExpense.id == id,
+            RecurringExpense.user_id == current_user.id,
+        )
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Recurring expense not found")
+    await session.commit()
+    return
+
+
+async def main(today: date | None):
+    written = await run_pass(today)
+    await scheduler_engine.dispose()
+    print(f"materialized {written} recurring expenses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write due occurrences of recurring expenses"
+    )
+    parser.add_argument("--today", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.today))
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import engine
+from app.models import DailySpend, Expense
+
+
+# request schemas carry expense dates as datetimes, the tables store dates
+def as_date(value: date | datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+# apply (date, category_id) -> (amount, count) changes for one user in a single
+# upsert, in the caller's transaction
+async def apply_deltas(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    deltas: dict[tuple[date, uuid.UUID], tuple[float, int]],
+):
+    if not deltas:
+        return
+
+    stmt = pg_insert(DailySpend).values(
+        [
+            {
+                "user_id": user_id,
+                "date": day,
+                "category_id": category_id,
+                "total": amount,
+                "count": count,
+            }
+            for (day, category_id), (amount, count) in deltas.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "date", "category_id"],
+        set_={
+            "total": DailySpend.total + stmt.excluded.total,
+            "count": DailySpend.count + stmt.excluded.count,
+        },
+    )
+    await session.execute(stmt)
+
+    # drop days that no longer have any expenses. only keys this change
+    # decremented can have emptied, so the delete never scans the user's rows
+    emptied = [key for key, (_, count) in deltas.items() if count < 0]
+    if emptied:
+        await session.execute(
+            delete(DailySpend).where(
+                DailySpend.user_id == user_id,
+                tuple_(DailySpend.date, DailySpend.category_id).in_(emptied),
+                DailySpend.count <= 0,
+            )
+        )
+
+
+# rebuild the rollup from the expenses table, for one user or everyone
+async def backfill(session: AsyncSession, user_id: uuid.UUID | None = None):
+    clear = delete(DailySpend)
+    source = (
+        select(
+            Expense.user_id,
+            Expense.date,
+            Expense.category_id,
+            func.sum(Expense.amount),
+            func.count(),
+        )
+        .where(Expense.deleted_at.is_(None))
+        .group_by(Expense.user_id, Expense.date, Expense.category_id)
+    )
+
+    if user_id:
+        clear = clear.where(DailySpend.user_id == user_id)
+        source = source.where(Expense.user_id == user_id)
+
+    await session.execute(clear)
+    await session.execute(
+        insert(DailySpend).from_select(
+            ["user_id", "date", "category_id", "total", "count"], source
+        )
+    )
+
+
+async def main(user_id: uuid.UUID | None):
+    async with AsyncSession(engine) as session:
+        await backfill(session, user_id)
+        await session.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rebuild the daily_spend rollup from expenses"
+    )
+    parser.add_argument("--user-id", type=uuid.UUID, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id))
@@ -1,8 +1,8 @@
 import uuid
 from datetime import date, datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlmodel import SQLModel
 
 
@@ -36,5 +36,68 @@ class ExpenseRead(SQLModel):
     description: str | None
     date: date
     created_at: datetime
+    updated_at: datetime
 
     category: Optional[CategoryRead]
+
+
+class ExpensePage(SQLModel):
+    items: list[ExpenseRead]
+    next_cursor: str | None = None
+
+
+class ExpenseChanges(SQLModel):
+    items: list[ExpenseRead]
+    deleted: list[uuid.UUID]
+    next_cursor: str | None = None
+    has_more: bool = False
+
+
+class RecurringExpenseRequest(BaseModel):
+    amount: float
+    category_id: uuid.UUID
+    description: str | None = None
+    freq: Literal["daily", "weekly", "monthly", "yearly"]
+    interval: int = Field(1, ge=1)
+    start_date: date
+    until: date | None = None
+    count: int | None = Field(None, ge=1)
+
+
+class JobRead(SQLModel):
+    id: uuid.UUID
+    kind: str
+    status: str
+    progress: float
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    # set once a job with a downloadable result is done
+    result_url: str | None = None
+
+
+class BatchCreate(CreateExpense):
+    op: Literal["create"]
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: uuid.UUID
+    amount: float | None = None
+    description: str | None = None
+    date: datetime | None = None
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: uuid.UUID
+
+
+BatchOperation = Annotated[
+    Union[BatchCreate, BatchUpdate, BatchDelete], Field(discriminator="op")
+]
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(max_length=1000)
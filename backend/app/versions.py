@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import DateTime, cast, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import mark_write
+from app.deps import get_current_user, get_read_session
+from app.models import User
+
+
+# every write to a user's expenses or categories bumps their data version,
+# first thing in the write's transaction. the row lock it takes serializes the
+# user's writes, and the timestamp is read from the database clock once the
+# lock is held, so it increases in commit order across every app process and
+# can be used as the write's updated_at
+async def bump_data_version(session: AsyncSession, user_id: uuid.UUID) -> datetime:
+    mark_write(session, user_id)
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .returning(db_now())
+    )
+    return result.scalar_one()
+
+
+# database time as a naive timestamp, like the app's timestamp columns.
+# clock_timestamp() rather than now(), which is frozen at transaction start
+def db_now():
+    return cast(func.clock_timestamp(), DateTime)
+
+
+# resolves the caller's data version and answers a matching If-None-Match
+# with 304 before the route touches any expense data. reads the same session
+# as the route, so the version and the data come from the same database
+async def get_data_version(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+) -> int:
+    return await check_data_version(request, response, current_user, session)
+
+
+# get_data_version for responses that depend on more than the user's data,
+# like a range defaulted from today. the extra parts go into the etag so the
+# response changes when they do
+async def check_data_version(
+    request: Request,
+    response: Response,
+    current_user: User,
+    session: AsyncSession,
+    *validators: object,
+) -> int:
+    version = (
+        await session.exec(select(User.data_version).where(User.id == current_user.id))
+    ).one()
+
+    parts = [current_user.id.hex, str(version), *map(str, validators)]
+    etag = f'W/"{"-".join(parts)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return version
@@ -0,0 +1,275 @@
+# drives every router against a seeded database and reports throughput and
+# p50/p95/p99 latency per scenario. by default the app runs in-process over
+# ASGI, --base-url points it at a running server instead
+#
+#   uv run python -m bench.seed --seed 42
+#   uv run python -m bench.run --out results.json
+#   uv run python -m bench.run --baseline bench/baseline.json
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import httpx
+
+from bench.seed import END_DATE, PASSWORD, username
+
+# worst-case slowdown of a scenario's p95 before --baseline fails the run
+DEFAULT_TOLERANCE = 0.25
+
+
+# per-user state collected once before measuring
+class Context:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.users: list[dict] = []
+
+    def user(self) -> dict:
+        return self.rng.choice(self.users)
+
+    def window(self, days: int) -> dict:
+        end = END_DATE - timedelta(days=self.rng.randint(0, 365))
+        return {"date_from": str(end - timedelta(days=days)), "date_to": str(end)}
+
+
+def list_first_page(client, ctx):
+    user = ctx.user()
+    return client.get("/expenses/", params={"limit": 50}, headers=user["headers"])
+
+
+def list_next_page(client, ctx):
+    user = ctx.user()
+    params = {"limit": 50, "cursor": user["cursor"]}
+    return client.get("/expenses/", params=params, headers=user["headers"])
+
+
+def filter_date(client, ctx):
+    user = ctx.user()
+    params = {"limit": 50, **ctx.window(30)}
+    return client.get("/expenses/", params=params, headers=user["headers"])
+
+
+def filter_category(client, ctx):
+    user = ctx.user()
+    params = {"limit": 50, "category_id": ctx.rng.choice(user["categories"])}
+    return client.get("/expenses/", params=params, headers=user["headers"])
+
+
+def analytics_spending(client, ctx):
+    user = ctx.user()
+    params = {"granularity": "month", **ctx.window(365)}
+    return client.get("/analytics/spending", params=params, headers=user["headers"])
+
+
+def analytics_dashboard(client, ctx):
+    user = ctx.user()
+    return client.get(
+        "/analytics/dashboard", params=ctx.window(90), headers=user["headers"]
+    )
+
+
+def expense_data(ctx, user) -> dict:
+    return {
+        "amount": round(ctx.rng.uniform(1, 100), 2),
+        "category_id": ctx.rng.choice(user["categories"]),
+        "date": str(END_DATE),
+        "description": "bench",
+    }
+
+
+def create_expense(client, ctx):
+    user = ctx.user()
+    return client.post(
+        "/expenses/", json=expense_data(ctx, user), headers=user["headers"]
+    )
+
+
+# the same rows written by one POST /expenses/batch and by one POST each,
+# timed per group so the two scenarios compare directly
+BATCH_SIZE = 50
+
+
+async def create_batch(client, ctx):
+    user = ctx.user()
+    operations = [
+        {"op": "create", **expense_data(ctx, user)} for _ in range(BATCH_SIZE)
+    ]
+    return await client.post(
+        "/expenses/batch", json={"operations": operations}, headers=user["headers"]
+    )
+
+
+async def create_singles(client, ctx):
+    user = ctx.user()
+    for _ in range(BATCH_SIZE):
+        response = await client.post(
+            "/expenses/", json=expense_data(ctx, user), headers=user["headers"]
+        )
+        if response.status_code >= 400:
+            break
+    return response
+
+
+def login(client, ctx):
+    data = {"username": ctx.user()["username"], "password": PASSWORD}
+    return client.post("/auth/login", data=data)
+
+
+# writes run last so the read scenarios always see the seeded data
+SCENARIOS = {
+    "list": list_first_page,
+    "list_next_page": list_next_page,
+    "filter_date": filter_date,
+    "filter_category": filter_category,
+    "analytics_spending": analytics_spending,
+    "analytics_dashboard": analytics_dashboard,
+    "login": login,
+    "create": create_expense,
+    "create_batch": create_batch,
+    "create_singles": create_singles,
+}
+
+
+async def prepare(client: httpx.AsyncClient, ctx: Context, prefix: str, users: int):
+    for index in range(users):
+        name = username(prefix, index)
+        response = await client.post(
+            "/auth/login", data={"username": name, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        categories = (await client.get("/categories/", headers=headers)).json()
+        page = (await client.get("/expenses/", headers=headers)).json()
+        ctx.users.append(
+            {
+                "username": name,
+                "headers": headers,
+                "categories": [category["id"] for category in categories],
+                "cursor": page["next_cursor"],
+            }
+        )
+
+
+async def measure(client, ctx: Context, scenario, requests: int, concurrency: int):
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await scenario(client, ctx)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": round(requests / elapsed, 2),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        limit = before["p95_ms"] * (1 + tolerance)
+        if result["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']} ms, baseline {before['p95_ms']} ms"
+            )
+    return regressions
+
+
+async def main(args) -> int:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    ctx = Context(random.Random(args.seed))
+    names = args.scenario or list(SCENARIOS)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=60
+    ) as client:
+        await prepare(client, ctx, args.prefix, args.users)
+
+        scenarios = {}
+        for name in names:
+            # a short warmup fills pools and caches before timing
+            for _ in range(args.concurrency):
+                await SCENARIOS[name](client, ctx)
+            scenarios[name] = await measure(
+                client, ctx, SCENARIOS[name], args.requests, args.concurrency
+            )
+            result = scenarios[name]
+            print(
+                f"{name:>20}: {result['throughput']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  "
+                f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}"
+            )
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "target": args.base_url or "asgi",
+            "seed": args.seed,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": scenarios,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the API")
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--users", type=int, default=10, help="seeded users to use")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--out", default=None, help="write results as json")
+    parser.add_argument("--baseline", default=None, help="fail on p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,155 @@
+# fills the database with reproducible synthetic users, categories and
+# expenses for benchmarking. the same --seed always produces the same rows
+#
+#   uv run python -m bench.seed --users 100 --expenses 2000 --seed 42
+import argparse
+import asyncio
+import math
+import random
+import re
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import engine
+from app.rollup import backfill
+from app.security import hash_password
+
+PASSWORD = "bench-password"
+# expense dates end here rather than today, so a seed always means the same rows
+END_DATE = date(2026, 1, 1)
+
+# name, color, share of a user's expenses, median amount, spread of amounts
+CATEGORIES = (
+    ("Groceries", "#22c55e", 30, 35.0, 0.6),
+    ("Dining", "#f97316", 18, 22.0, 0.7),
+    ("Transport", "#3b82f6", 15, 12.0, 0.8),
+    ("Coffee", "#a16207", 12, 4.5, 0.3),
+    ("Shopping", "#ec4899", 8, 60.0, 1.0),
+    ("Entertainment", "#8b5cf6", 6, 25.0, 0.8),
+    ("Utilities", "#64748b", 4, 90.0, 0.4),
+    ("Health", "#ef4444", 3, 45.0, 0.9),
+    ("Travel", "#0ea5e9", 2, 250.0, 1.1),
+    ("Rent", "#111827", 2, 1200.0, 0.2),
+)
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "full_name", "disabled")
+CATEGORY_COLUMNS = ("id", "name", "color", "user_id")
+EXPENSE_COLUMNS = (
+    "id",
+    "amount",
+    "description",
+    "category_id",
+    "user_id",
+    "date",
+    "created_at",
+    "updated_at",
+)
+
+
+def username(prefix: str, index: int) -> str:
+    return f"{prefix}{index}"
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+# yields (users, categories, expenses) row tuples one user at a time
+def generate(
+    prefix: str, users: int, expenses: int, days: int, seed: int, hashed: str
+):
+    rng = random.Random(seed)
+    now = datetime.combine(END_DATE, datetime.min.time())
+
+    for index in range(users):
+        user_id = _uuid(rng)
+        name = username(prefix, index)
+        user = (user_id, name, f"{name}@example.com", hashed, None, False)
+
+        # every user has the common categories plus a few of the rarer ones
+        profiles = list(CATEGORIES[:4]) + rng.sample(CATEGORIES[4:], rng.randint(2, 6))
+        categories = [
+            (_uuid(rng), profile[0], profile[1], user_id) for profile in profiles
+        ]
+        weights = [profile[2] for profile in profiles]
+
+        # some users log a lot more than others
+        count = max(1, int(rng.lognormvariate(math.log(expenses), 0.5)))
+        rows = []
+        for position in rng.choices(range(len(profiles)), weights, k=count):
+            category, _, _, median, spread = profiles[position]
+            amount = round(rng.lognormvariate(math.log(median), spread), 2)
+            # recent days are denser than old ones
+            day = END_DATE - timedelta(days=int(days * rng.random() ** 1.5))
+            rows.append(
+                (
+                    _uuid(rng),
+                    amount,
+                    f"{category} #{rng.randint(1, 9999)}",
+                    categories[position][0],
+                    user_id,
+                    day,
+                    now,
+                    now,
+                )
+            )
+
+        yield user, categories, rows
+
+
+async def seed(prefix: str, users: int, expenses: int, days: int, seed: int):
+    # one hash for everyone, argon2 is far too slow to run per user
+    hashed = hash_password(PASSWORD)
+    total = 0
+
+    async with AsyncSession(engine) as session:
+        conn = await session.connection()
+        raw = (await conn.get_raw_connection()).driver_connection
+
+        async with raw.cursor() as cur:
+            await _clear(cur, prefix)
+
+            batches = generate(prefix, users, expenses, days, seed, hashed)
+            for user, categories, rows in batches:
+                await _copy(cur, "users", USER_COLUMNS, [user])
+                await _copy(cur, "categories", CATEGORY_COLUMNS, categories)
+                await _copy(cur, "expenses", EXPENSE_COLUMNS, rows)
+                total += len(rows)
+
+        await backfill(session)
+        await session.commit()
+
+    await engine.dispose()
+    print(f"seeded {users} users and {total} expenses")
+
+
+async def _copy(cur, table: str, columns: tuple[str, ...], rows: list[tuple]):
+    async with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            await copy.write_row(row)
+
+
+# remove rows left by an earlier run with the same prefix. only names that
+# generate() could have produced match
+async def _clear(cur, prefix: str):
+    pattern = f"^{re.escape(prefix)}[0-9]+$"
+    users = "SELECT id FROM users WHERE username ~ %s"
+    for table in ("daily_spend", "expenses", "categories"):
+        await cur.execute(
+            f"DELETE FROM {table} WHERE user_id IN ({users})", (pattern,)
+        )
+    await cur.execute("DELETE FROM users WHERE username ~ %s", (pattern,))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic benchmark data")
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--expenses", type=int, default=2000, help="median per user")
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.prefix, args.users, args.expenses, args.days, args.seed))
@@ -0,0 +1,108 @@
+# compares serializing a page of expenses through the old ORM + response_model
+# path against the row dict + orjson path used by the list endpoints
+#
+#   uv run python -m bench.serialization --rows 10000
+import argparse
+import json
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.expenses import READ_COLUMNS, expense_row
+from app.models import Category, Expense
+from app.schemas import ExpensePage, ExpenseRead
+
+Row = namedtuple("Row", [column.key for column in READ_COLUMNS])
+
+
+def make_data(count: int):
+    categories = [
+        Category(id=uuid.uuid4(), user_id=uuid.uuid4(), name=f"cat {i}", color="red")
+        for i in range(10)
+    ]
+    now = datetime.now()
+    expenses, rows = [], []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        expense = Expense(
+            id=uuid.uuid4(),
+            amount=i * 1.25,
+            description=f"expense {i}",
+            category_id=category.id,
+            user_id=category.user_id,
+            date=date.today() - timedelta(days=i % 365),
+            created_at=now,
+            updated_at=now,
+        )
+        expense.category = category
+        expenses.append(expense)
+        rows.append(
+            Row(
+                expense.id,
+                expense.amount,
+                expense.description,
+                expense.date,
+                expense.created_at,
+                expense.updated_at,
+                category.id,
+                category.name,
+                category.color,
+            )
+        )
+    return expenses, rows
+
+
+# what the endpoint did before: validate every ORM instance into the response
+# model, let FastAPI validate it again against response_model and encode the
+# result with the stdlib json
+def orm_path(expenses) -> bytes:
+    page = ExpensePage(
+        items=[ExpenseRead.model_validate(expense) for expense in expenses],
+        next_cursor=None,
+    )
+    content = ExpensePage.model_validate(page, from_attributes=True)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def row_path(rows) -> bytes:
+    return orjson.dumps(
+        {"items": [expense_row(row) for row in rows], "next_cursor": None}
+    )
+
+
+def bench(name: str, fn, data, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        timings.append(time.perf_counter() - start)
+    best = min(timings) * 1000
+    mean = sum(timings) / repeat * 1000
+    print(f"{name:>6}: best {best:8.2f} ms, mean {mean:8.2f} ms")
+    return best
+
+
+def main(count: int, repeat: int):
+    expenses, rows = make_data(count)
+    # both paths must produce the same document
+    assert orjson.loads(orm_path(expenses)) == orjson.loads(row_path(rows))
+
+    print(f"serializing {count} expenses, best of {repeat}")
+    orm = bench("orm", orm_path, expenses, repeat)
+    row = bench("row", row_path, rows, repeat)
+    print(f"speedup: {orm / row:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list serialization")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.rows, args.repeat)
@@ -0,0 +1,173 @@
+# compares requests/sec of the same authenticated expense page served by a
+# sync stack (def routes, sync Session, Starlette's threadpool) and the async
+# stack the app uses (async def routes, AsyncSession on psycopg async). both
+# apps decode the token, load the user and fetch one page, without caches
+#
+#   uv run python -m bench.seed --seed 42
+#   uv run python -m bench.stacks --concurrency 64
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, status
+from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.db import engine
+from app.deps import oauth2_scheme
+from app.expenses import READ_COLUMNS, _filter_expenses, expense_row
+from app.models import Category, Expense, User
+from app.security import create_access_token, decode_token
+from bench.run import Context, list_first_page, measure
+from bench.seed import username
+
+# Starlette runs sync routes and dependencies on anyio's 40 worker threads.
+# the pool needs a connection per thread: with fewer, threads blocked on the
+# pool starve the requests already holding a connection and nothing finishes
+THREADPOOL_SIZE = 40
+
+sync_engine = create_engine(
+    settings.DATABASE_URL, pool_size=THREADPOOL_SIZE, max_overflow=0
+)
+
+
+def page_statement(user: User, limit: int):
+    stmt = (
+        select(*READ_COLUMNS)
+        .join(Category, Category.id == Expense.category_id)
+        .order_by(Expense.date.desc(), Expense.id.desc())
+        .limit(limit)
+    )
+    return _filter_expenses(stmt, user, None, None, None)
+
+
+def user_statement(token: str):
+    username = decode_token(token).get("sub")
+    if not username:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return select(User).where(User.username == username)
+
+
+sync_app = FastAPI()
+
+
+def get_sync_session():
+    with Session(sync_engine) as session:
+        yield session
+
+
+def get_sync_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_sync_session),
+) -> User:
+    user = session.exec(user_statement(token)).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user
+
+
+@sync_app.get("/expenses/")
+def sync_expenses(
+    limit: int = 50,
+    user: User = Depends(get_sync_user),
+    session: Session = Depends(get_sync_session),
+):
+    rows = session.exec(page_statement(user, limit)).all()
+    return {"items": [expense_row(row) for row in rows]}
+
+
+async_app = FastAPI()
+
+
+async def get_async_session():
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_user(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    user = (await session.exec(user_statement(token))).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return user
+
+
+@async_app.get("/expenses/")
+async def async_expenses(
+    limit: int = 50,
+    user: User = Depends(get_async_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    rows = (await session.exec(page_statement(user, limit))).all()
+    return {"items": [expense_row(row) for row in rows]}
+
+
+STACKS = {"sync": sync_app, "async": async_app}
+
+
+async def main(args) -> int:
+    ctx = Context(random.Random(args.seed))
+    for index in range(args.users):
+        token = create_access_token(username(args.prefix, index))
+        ctx.users.append({"headers": {"Authorization": f"Bearer {token}"}})
+
+    stacks = {}
+    for name, app in STACKS.items():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        ) as client:
+            # a short warmup fills the pool before timing
+            for _ in range(args.concurrency):
+                (await list_first_page(client, ctx)).raise_for_status()
+            stacks[name] = await measure(
+                client, ctx, list_first_page, args.requests, args.concurrency
+            )
+        result = stacks[name]
+        print(
+            f"{name:>6}: {result['throughput']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  "
+            f"p99 {result['p99_ms']:7.2f} ms  errors {result['errors']}"
+        )
+
+    speedup = stacks["async"]["throughput"] / stacks["sync"]["throughput"]
+    print(f"async/sync throughput: {speedup:.2f}x")
+
+    sync_engine.dispose()
+    await engine.dispose()
+
+    if args.out:
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "seed": args.seed,
+                "users": args.users,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+            },
+            "stacks": stacks,
+        }
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the sync and async database stacks"
+    )
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--users", type=int, default=10, help="seeded users to use")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="write results as json")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
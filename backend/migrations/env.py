@@ -1,3 +1,4 @@
+import re
 from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
@@ -16,6 +17,13 @@ config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
 target_metadata = SQLModel.metadata
 
+# expense partitions are managed by app/partitions.py, not the models
+EXPENSE_PARTITION = re.compile(r"^expenses_(p\d{4}|default)$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and EXPENSE_PARTITION.match(name))
+
 
 def run_migrations_online():
     connectable = engine_from_config(
@@ -29,6 +37,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,67 @@
+"""add composite indexes
+
+Revision ID: 2f2191dd1938
+Revises: dcca334aec1f
+Create Date: 2026-10-18 12:20:41.561930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2f2191dd1938"
+down_revision: Union[str, Sequence[str], None] = "dcca334aec1f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # build concurrently so writes keep flowing on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_expenses_user_id_date_id",
+            "expenses",
+            ["user_id", "date", "id"],
+            unique=False,
+            postgresql_include=["amount", "category_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_expenses_category_id_date_id",
+            "expenses",
+            ["category_id", "date", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_categories_user_id"),
+            "categories",
+            ["user_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # both are prefixes of the composite indexes above
+        op.drop_index(
+            op.f("ix_expenses_user_id"),
+            table_name="expenses",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f("ix_expenses_category_id"),
+            table_name="expenses",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        op.f("ix_expenses_category_id"), "expenses", ["category_id"], unique=False
+    )
+    op.create_index(op.f("ix_expenses_user_id"), "expenses", ["user_id"], unique=False)
+    op.drop_index(op.f("ix_categories_user_id"), table_name="categories")
+    op.drop_index("ix_expenses_category_id_date_id", table_name="expenses")
+    op.drop_index("ix_expenses_user_id_date_id", table_name="expenses")
@@ -0,0 +1,31 @@
+"""add users data_version
+
+Revision ID: 7b3e9d41c6a2
+Revises: 2f2191dd1938
+Create Date: 2026-10-18 13:05:12.208114
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b3e9d41c6a2"
+down_revision: Union[str, Sequence[str], None] = "2f2191dd1938"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("data_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "data_version")
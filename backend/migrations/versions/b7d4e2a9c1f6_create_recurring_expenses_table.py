@@ -0,0 +1,89 @@
+"""create recurring expenses table
+
+Revision ID: b7d4e2a9c1f6
+Revises: a3c9e7f1b2d4
+Create Date: 2026-10-18 20:45:31.662019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d4e2a9c1f6"
+down_revision: Union[str, Sequence[str], None] = "a3c9e7f1b2d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "recurring_expenses",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("category_id", sa.Uuid(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("freq", sa.String(), nullable=False),
+        sa.Column("interval", sa.Integer(), nullable=False),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("until", sa.Date(), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=True),
+        sa.Column("materialized", sa.Integer(), nullable=False),
+        sa.Column("next_date", sa.Date(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["category_id"],
+            ["categories.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_recurring_expenses_user_id"),
+        "recurring_expenses",
+        ["user_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_recurring_expenses_next_date_id",
+        "recurring_expenses",
+        ["next_date", "id"],
+        unique=False,
+    )
+
+    # adding a nullable column to the partitioned table doesn't rewrite it
+    op.add_column("expenses", sa.Column("recurring_id", sa.Uuid(), nullable=True))
+    op.create_foreign_key(
+        "expenses_recurring_id_fkey",
+        "expenses",
+        "recurring_expenses",
+        ["recurring_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+    # can't be built concurrently on a partitioned table
+    op.create_index(
+        "ix_expenses_recurring_id_date",
+        "expenses",
+        ["recurring_id", "date"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_expenses_recurring_id_date", table_name="expenses")
+    op.drop_constraint("expenses_recurring_id_fkey", "expenses", type_="foreignkey")
+    op.drop_column("expenses", "recurring_id")
+    op.drop_index("ix_recurring_expenses_next_date_id", table_name="recurring_expenses")
+    op.drop_index(
+        op.f("ix_recurring_expenses_user_id"), table_name="recurring_expenses"
+    )
+    op.drop_table("recurring_expenses")
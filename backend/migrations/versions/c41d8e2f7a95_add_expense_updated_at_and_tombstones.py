@@ -0,0 +1,45 @@
+"""add expense updated_at and tombstones
+
+Revision ID: c41d8e2f7a95
+Revises: 7b3e9d41c6a2
+Create Date: 2026-10-18 14:02:37.915406
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41d8e2f7a95"
+down_revision: Union[str, Sequence[str], None] = "7b3e9d41c6a2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("expenses", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.add_column("expenses", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    # existing rows haven't changed since they were created
+    op.execute("UPDATE expenses SET updated_at = created_at")
+    op.alter_column("expenses", "updated_at", nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_expenses_user_id_updated_at_id",
+            "expenses",
+            ["user_id", "updated_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_expenses_user_id_updated_at_id", table_name="expenses")
+    # tombstones have no place in a schema without deleted_at
+    op.execute("DELETE FROM expenses WHERE deleted_at IS NOT NULL")
+    op.drop_column("expenses", "deleted_at")
+    op.drop_column("expenses", "updated_at")
@@ -0,0 +1,31 @@
+"""add users token_version
+
+Revision ID: d2f8a4c6e1b9
+Revises: c9e1d5a7f3b8
+Create Date: 2026-10-18 23:41:27.905316
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2f8a4c6e1b9"
+down_revision: Union[str, Sequence[str], None] = "c9e1d5a7f3b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "token_version")
@@ -0,0 +1,53 @@
+"""create daily spend table
+
+Revision ID: dcca334aec1f
+Revises: 862ac4848293
+Create Date: 2026-10-18 10:02:11.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "dcca334aec1f"
+down_revision: Union[str, Sequence[str], None] = "862ac4848293"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "daily_spend",
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.Uuid(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["category_id"],
+            ["categories.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "date", "category_id"),
+    )
+    # backfill from existing expenses
+    op.execute(
+        """
+        INSERT INTO daily_spend (user_id, date, category_id, total, count)
+        SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY user_id, date, category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("daily_spend")
@@ -0,0 +1,63 @@
+"""add expense search indexes
+
+Revision ID: e5a1f0b3d7c2
+Revises: c41d8e2f7a95
+Create Date: 2026-10-18 16:41:08.377120
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a1f0b3d7c2"
+down_revision: Union[str, Sequence[str], None] = "c41d8e2f7a95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # gin operator classes for plain types, so user_id can lead the indexes
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # a stored generated column rewrites the table once
+    op.add_column(
+        "expenses",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(description, ''))"),
+            nullable=True,
+        ),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_expenses_user_id_search_vector",
+            "expenses",
+            ["user_id", "search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_expenses_user_id_description_trgm",
+            "expenses",
+            ["user_id", "description"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_expenses_user_id_description_trgm", table_name="expenses")
+    op.drop_index("ix_expenses_user_id_search_vector", table_name="expenses")
+    op.drop_column("expenses", "search_vector")
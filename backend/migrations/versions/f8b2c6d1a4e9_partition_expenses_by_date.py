@@ -0,0 +1,142 @@
+"""partition expenses by date
+
+Revision ID: f8b2c6d1a4e9
+Revises: e5a1f0b3d7c2
+Create Date: 2026-10-18 18:12:44.603187
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f8b2c6d1a4e9"
+down_revision: Union[str, Sequence[str], None] = "e5a1f0b3d7c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, amount, description, category_id, user_id, date, "
+    "created_at, updated_at, deleted_at"
+)
+
+
+def _create_expenses(name: str, primary_key: tuple[str, ...], **kw) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("category_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(description, ''))"),
+            nullable=True,
+        ),
+        # fk names can repeat across tables, so these are final already
+        sa.ForeignKeyConstraint(
+            ["category_id"], ["categories.id"], name="expenses_category_id_fkey"
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], name="expenses_user_id_fkey"
+        ),
+        sa.PrimaryKeyConstraint(*primary_key, name=f"{name}_pkey"),
+        **kw,
+    )
+
+
+def _swap_in(name: str) -> None:
+    op.drop_table("expenses")
+    op.rename_table(name, "expenses")
+    op.execute(f"ALTER TABLE expenses RENAME CONSTRAINT {name}_pkey TO expenses_pkey")
+
+
+# indexes on a partitioned table can't be built concurrently, each one
+# cascades to every partition
+def _create_indexes() -> None:
+    op.create_index(
+        "ix_expenses_user_id_date_id",
+        "expenses",
+        ["user_id", "date", "id"],
+        unique=False,
+        postgresql_include=["amount", "category_id"],
+    )
+    op.create_index(
+        "ix_expenses_category_id_date_id",
+        "expenses",
+        ["category_id", "date", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_expenses_user_id_updated_at_id",
+        "expenses",
+        ["user_id", "updated_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_expenses_user_id_search_vector",
+        "expenses",
+        ["user_id", "search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_expenses_user_id_description_trgm",
+        "expenses",
+        ["user_id", "description"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # copies every expense under an exclusive lock, run it in a quiet window
+    _create_expenses(
+        "expenses_partitioned",
+        ("id", "date"),
+        postgresql_partition_by="RANGE (date)",
+    )
+
+    # a partition per year of existing data through next year, anything else
+    # goes to the default partition until app/partitions.py adds its year
+    first, last = op.get_bind().execute(
+        sa.text("SELECT min(date), max(date) FROM expenses")
+    ).one()
+    this_year = date.today().year
+    start = first.year if first else this_year
+    end = max(last.year if last else this_year, this_year + 1)
+    for year in range(start, end + 1):
+        op.execute(
+            f"CREATE TABLE expenses_p{year} PARTITION OF expenses_partitioned "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    op.execute(
+        "CREATE TABLE expenses_default PARTITION OF expenses_partitioned DEFAULT"
+    )
+
+    op.execute(
+        f"INSERT INTO expenses_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM expenses"
+    )
+    _swap_in("expenses_partitioned")
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # partitions already detached into the archive schema are not copied back
+    _create_expenses("expenses_plain", ("id",))
+    op.execute(f"INSERT INTO expenses_plain ({COLUMNS}) SELECT {COLUMNS} FROM expenses")
+    _swap_in("expenses_plain")
+    _create_indexes()
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import analytics
+
+EXPENSES = [
+    ("2024-01-15", 10.0),
+    ("2024-02-20", 20.0),
+    ("2024-05-01", 5.0),
+    ("2025-03-31", 7.5),
+]
+
+BUCKETS = {
+    "day": ("2024-01-01", "2024-01-03", ["2024-01-01", "2024-01-02", "2024-01-03"]),
+    "week": ("2024-01-01", "2024-01-21", ["2024-01-01", "2024-01-08", "2024-01-15"]),
+    "month": ("2024-01-01", "2024-03-31", ["2024-01-01", "2024-02-01", "2024-03-01"]),
+    "quarter": (
+        "2024-01-01",
+        "2025-03-31",
+        [
+            "2024-01-01",
+            "2024-04-01",
+            "2024-07-01",
+            "2024-10-01",
+            "2025-01-01",
+        ],
+    ),
+    "year": ("2024-01-01", "2025-12-31", ["2024-01-01", "2025-01-01"]),
+}
+
+TOTALS = {
+    "day": [0.0, 0.0, 0.0],
+    "week": [0.0, 0.0, 10.0],
+    "month": [10.0, 20.0, 0.0],
+    "quarter": [30.0, 5.0, 0.0, 0.0, 7.5],
+    "year": [35.0, 7.5],
+}
+
+
+@pytest.fixture
+def expenses(client, auth, category):
+    for day, amount in EXPENSES:
+        response = client.post(
+            "/expenses/",
+            json={"amount": amount, "category_id": category["id"], "date": day},
+            headers=auth,
+        )
+        assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("granularity", list(BUCKETS))
+def test_spending_buckets(client, auth, expenses, granularity):
+    date_from, date_to, labels = BUCKETS[granularity]
+    response = client.get(
+        "/analytics/spending",
+        params={
+            "granularity": granularity,
+            "date_from": date_from,
+            "date_to": date_to,
+        },
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["granularity"] == granularity
+    assert body["labels"] == labels
+    assert body["data"] == TOTALS[granularity]
+
+
+@pytest.mark.parametrize("granularity", list(BUCKETS))
+def test_spending_default_range(client, auth, granularity):
+    response = client.get(
+        "/analytics/spending",
+        params={"granularity": granularity, "tz": "Europe/Berlin"},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["labels"]
+    assert all(total == 0 for total in body["data"])
+
+
+def test_spending_rejects_unknown_timezone(client, auth):
+    response = client.get(
+        "/analytics/spending", params={"tz": "Mars/Olympus"}, headers=auth
+    )
+    assert response.status_code == 400
+
+
+def test_spending_etag_follows_the_default_range(client, auth, monkeypatch):
+    response = client.get("/analytics/spending", headers=auth)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    conditional = {**auth, "If-None-Match": etag}
+    response = client.get("/analytics/spending", headers=conditional)
+    assert response.status_code == 304
+
+    # midnight passes without any write, the default range now ends tomorrow
+    tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+
+    class Tomorrow(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return tomorrow.astimezone(tz)
+
+    monkeypatch.setattr(analytics, "datetime", Tomorrow)
+    response = client.get("/analytics/spending", headers=conditional)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["labels"][-1] == tomorrow.date().replace(day=1).isoformat()
@@ -0,0 +1,56 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.models import User
+from app.security import create_access_token
+
+
+def bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+# another process bumped the version, this one still caches the old principal
+def test_newer_token_refreshes_the_cached_principal(client, auth, username):
+    assert client.get("/categories/", headers=auth).status_code == 200
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE users SET token_version = 1 WHERE username = :username"),
+            {"username": username},
+        )
+    engine.dispose()
+
+    newer = bearer(create_access_token(username, 1))
+    assert client.get("/categories/", headers=newer).status_code == 200
+    assert client.get("/categories/", headers=auth).status_code == 401
+
+
+def test_disabling_revokes_tokens(client, auth, username):
+    assert client.get("/categories/", headers=auth).status_code == 200
+
+    async def disable():
+        engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+        async with AsyncSession(engine) as session:
+            user = (
+                await session.exec(select(User).where(User.username == username))
+            ).one()
+            user.disabled = True
+            await session.commit()
+            await session.refresh(user)
+            version = user.token_version
+        await engine.dispose()
+        return version
+
+    version = asyncio.run(disable())
+    assert version == 1
+    assert client.get("/categories/", headers=auth).status_code == 401
+    # a token at the new version is still refused while the user is disabled
+    newer = bearer(create_access_token(username, version))
+    assert client.get("/categories/", headers=newer).status_code == 401
@@ -0,0 +1,88 @@
+import uuid
+
+
+def test_batch_applies_operations_in_input_order(client, auth, category):
+    response = client.post(
+        "/expenses/",
+        json={"amount": 5, "category_id": category["id"], "date": "2025-01-02"},
+        headers=auth,
+    )
+    existing = response.json()["id"]
+    missing = str(uuid.uuid4())
+
+    response = client.post(
+        "/expenses/batch",
+        json={
+            "operations": [
+                {"op": "delete", "id": missing},
+                {
+                    "op": "create",
+                    "amount": 12.5,
+                    "category_id": category["id"],
+                    "date": "2025-01-03",
+                },
+                {"op": "update", "id": existing, "amount": 7},
+                {
+                    "op": "create",
+                    "amount": 1,
+                    "category_id": str(uuid.uuid4()),
+                    "date": "2025-01-03",
+                },
+            ]
+        },
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [
+        "not_found",
+        "created",
+        "updated",
+        "error",
+    ]
+    assert results[1]["expense"]["amount"] == 12.5
+    assert results[2]["expense"]["amount"] == 7
+
+    dashboard = client.get(
+        "/analytics/dashboard",
+        params={"date_from": "2025-01-01", "date_to": "2025-01-31"},
+        headers=auth,
+    ).json()
+    assert dashboard["total"] == 19.5
+    assert dashboard["count"] == 2
+
+
+def test_batch_and_single_updates_skip_the_same_values(client, auth, category):
+    ids = []
+    for _ in range(2):
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": 5,
+                "category_id": category["id"],
+                "date": "2025-01-02",
+                "description": "lunch",
+            },
+            headers=auth,
+        )
+        ids.append(response.json()["id"])
+
+    # zero and empty mean "unchanged" on both paths
+    single = client.put(
+        f"/expenses/{ids[0]}", params={"amount": 0, "description": ""}, headers=auth
+    )
+    assert single.status_code == 200, single.text
+    batch = client.post(
+        "/expenses/batch",
+        json={
+            "operations": [
+                {"op": "update", "id": ids[1], "amount": 0, "description": ""}
+            ]
+        },
+        headers=auth,
+    )
+    assert batch.status_code == 200, batch.text
+
+    for expense in (single.json(), batch.json()["results"][0]["expense"]):
+        assert expense["amount"] == 5
+        assert expense["description"] == "lunch"
@@ -0,0 +1,29 @@
+def test_changes_resume_from_cursor(client, auth, category):
+    def create(amount: float) -> dict:
+        response = client.post(
+            "/expenses/",
+            json={
+                "amount": amount,
+                "category_id": category["id"],
+                "date": "2025-02-01",
+            },
+            headers=auth,
+        )
+        return response.json()
+
+    first = create(1)
+    response = client.get("/expenses/changes", headers=auth)
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [first["id"]]
+
+    second = create(2)
+    client.delete(f"/expenses/{first['id']}", headers=auth)
+    response = client.get(
+        "/expenses/changes", params={"since": body["next_cursor"]}, headers=auth
+    )
+    changes = response.json()
+    assert [item["id"] for item in changes["items"]] == [second["id"]]
+    assert changes["deleted"] == [first["id"]]
+
+    # stamps come from the database clock, in commit order
+    assert second["updated_at"] > first["updated_at"]
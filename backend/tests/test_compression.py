@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def expenses(client, auth, category):
+    operations = [
+        {
+            "op": "create",
+            "amount": n + 1,
+            "category_id": category["id"],
+            "date": "2025-05-01",
+            "description": f"compressible expense {n}",
+        }
+        for n in range(50)
+    ]
+    response = client.post(
+        "/expenses/batch", json={"operations": operations}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_json_responses_are_gzipped(client, auth, expenses):
+    response = client.get(
+        "/expenses/", headers={**auth, "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["items"]) == 50
+
+
+def test_gzipped_exports_are_not_compressed_twice(client, auth, expenses):
+    response = client.get(
+        "/expenses/export",
+        params={"format": "ndjson", "gzip": True},
+        headers={**auth, "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in response.headers
+    # one layer of gzip around plain ndjson
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert len(lines) == 50
@@ -0,0 +1,75 @@
+import base64
+import json
+
+import pytest
+
+# several expenses per day, so pages split inside a run of equal dates
+DATES = ["2025-04-01"] * 4 + ["2025-04-02"] * 3 + ["2025-04-03"] * 2
+
+
+@pytest.fixture
+def expenses(client, auth, category) -> list[dict]:
+    operations = [
+        {"op": "create", "amount": n + 1, "category_id": category["id"], "date": day}
+        for n, day in enumerate(DATES)
+    ]
+    response = client.post(
+        "/expenses/batch", json={"operations": operations}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+    return [result["expense"] for result in response.json()["results"]]
+
+
+def test_pages_cover_every_expense_once(client, auth, expenses):
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/expenses/", params=params, headers=auth)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= 2
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 5
+    ids = [item["id"] for item in items]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == {expense["id"] for expense in expenses}
+    # newest date first, ties broken by id descending
+    keys = [(item["date"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_last_full_page_has_no_cursor(client, auth, expenses):
+    response = client.get("/expenses/", params={"limit": len(DATES)}, headers=auth)
+    assert len(response.json()["items"]) == len(DATES)
+    assert response.json()["next_cursor"] is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(b"42").decode(),
+        base64.urlsafe_b64encode(json.dumps(["yesterday", "x"]).encode()).decode(),
+    ],
+)
+def test_malformed_cursor_is_rejected(client, auth, cursor):
+    response = client.get("/expenses/", params={"cursor": cursor}, headers=auth)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_stream_returns_every_row_as_ndjson(client, auth, expenses):
+    response = client.get("/expenses/", params={"stream": True}, headers=auth)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len(DATES)
+    assert {row["id"] for row in rows} == {expense["id"] for expense in expenses}
+    assert {row["category"]["name"] for row in rows} == {"groceries"}
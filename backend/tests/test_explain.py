@@ -0,0 +1,194 @@
+import json
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import select
+
+from app.config import settings
+from app.expenses import READ_COLUMNS, _filter_expenses, search_statement
+from app.models import Category, Expense, User
+
+# enough rows that the planner's choices match production, not a toy table
+USERS = 200
+EXPENSES_PER_USER = 1000
+# share of expenses seeded as tombstones
+DELETED = 0.1
+
+
+@pytest.fixture(scope="module")
+def db(client):
+    # the app's startup created partitions for this year and the next
+    this_year = date.today().year
+    run = uuid.uuid4().hex[:8]
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (id, username, email, hashed_password, "
+                "disabled, data_version) "
+                "SELECT gen_random_uuid(), :run || '-' || n, "
+                ":run || '-' || n || '@example.com', '', false, 0 "
+                "FROM generate_series(1, :users) n"
+            ),
+            {"run": f"explain-{run}", "users": USERS},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO categories (id, user_id, name, color) "
+                "SELECT gen_random_uuid(), id, 'seeded', '#000000' FROM users "
+                "WHERE username LIKE :pattern"
+            ),
+            {"pattern": f"explain-{run}-%"},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO expenses (id, amount, description, category_id, "
+                "user_id, date, created_at, updated_at, deleted_at) "
+                "SELECT gen_random_uuid(), n % 100 + 1, 'seeded ' || n, c.id, "
+                "c.user_id, make_date(:year, 1, 1) + (n % 730), now(), now(), "
+                "CASE WHEN random() < :deleted THEN now() END "
+                "FROM categories c, generate_series(1, :per_user) n "
+                "WHERE c.user_id IN "
+                "(SELECT id FROM users WHERE username LIKE :pattern)"
+            ),
+            {
+                "year": this_year,
+                "deleted": DELETED,
+                "per_user": EXPENSES_PER_USER,
+                "pattern": f"explain-{run}-%",
+            },
+        )
+        user_id = conn.execute(
+            text("SELECT id FROM users WHERE username = :username"),
+            {"username": f"explain-{run}-1"},
+        ).scalar_one()
+
+    # sets the visibility map, without it index-only scans still visit the heap
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE expenses, categories"))
+
+    with engine.connect() as conn:
+        yield conn, user_id, this_year
+
+    with engine.begin() as conn:
+        seeded = "SELECT id FROM users WHERE username LIKE :pattern"
+        pattern = {"pattern": f"explain-{run}-%"}
+        for table, column in (
+            ("expenses", "user_id"),
+            ("categories", "user_id"),
+            ("users", "id"),
+        ):
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE {column} IN ({seeded})"), pattern
+            )
+    engine.dispose()
+
+
+# bound parameters are planned with their values, like literals would be
+def explain(conn, stmt, analyze: bool = False) -> dict:
+    params = {}
+    if not isinstance(stmt, str):
+        compiled = stmt.compile(dialect=conn.dialect)
+        stmt, params = str(compiled), compiled.params
+    options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    plan = conn.exec_driver_sql(f"EXPLAIN ({options}) {stmt}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+# every node in the plan, depth first
+def nodes(plan: dict) -> list[dict]:
+    found = [plan]
+    for child in plan.get("Plans", []):
+        found.extend(nodes(child))
+    return found
+
+
+def expense_scans(plan: dict) -> list[dict]:
+    return [
+        node
+        for node in nodes(plan)
+        if node.get("Relation Name", "").startswith("expenses")
+    ]
+
+
+def list_statement(user_id: uuid.UUID, **filters):
+    stmt = (
+        select(*READ_COLUMNS)
+        .join(Category, Category.id == Expense.category_id)
+        .order_by(Expense.date.desc(), Expense.id.desc())
+        .limit(51)
+    )
+    return _filter_expenses(
+        stmt,
+        User(id=user_id),
+        filters.get("date_from"),
+        filters.get("date_to"),
+        filters.get("category_id"),
+    )
+
+
+def test_expense_page_walks_the_covering_index(db):
+    conn, user_id, _ = db
+    plan = explain(conn, list_statement(user_id))
+
+    scans = expense_scans(plan)
+    assert scans
+    assert all(scan["Node Type"] != "Seq Scan" for scan in scans)
+    assert all("user_id_date_id" in scan.get("Index Name", "") for scan in scans)
+    # rows come back in (date, id) order straight from the index
+    assert not [node for node in nodes(plan) if node["Node Type"] == "Sort"]
+
+
+def test_date_range_prunes_partitions(db):
+    conn, user_id, this_year = db
+    plan = explain(
+        conn,
+        list_statement(
+            user_id,
+            date_from=date(this_year, 3, 1),
+            date_to=date(this_year, 9, 30),
+        ),
+    )
+    scanned = {scan["Relation Name"] for scan in expense_scans(plan)}
+    assert scanned == {f"expenses_p{this_year}"}
+
+
+def test_daily_totals_are_index_only(db):
+    conn, user_id, this_year = db
+    plan = explain(
+        conn,
+        "SELECT date, category_id, sum(amount), count(*) FROM expenses "
+        f"WHERE user_id = '{user_id}' AND deleted_at IS NULL "
+        f"AND date >= '{this_year}-01-01' AND date < '{this_year + 2}-01-01' "
+        "GROUP BY date, category_id",
+        analyze=True,
+    )
+
+    scans = expense_scans(plan)
+    assert scans
+    assert {scan["Node Type"] for scan in scans} == {"Index Only Scan"}
+    assert sum(scan["Heap Fetches"] for scan in scans) == 0
+
+
+def test_search_uses_the_gin_indexes(db):
+    conn, user_id, this_year = db
+    # one seeded description per user has this word
+    plan = explain(conn, search_statement(User(id=user_id), "777", None))
+
+    # partitions attach their own copies of the indexes, named after the
+    # partition and the columns
+    seeded = {f"expenses_p{this_year}", f"expenses_p{this_year + 1}"}
+    assert seeded <= {scan["Relation Name"] for scan in expense_scans(plan)}
+    for node in nodes(plan):
+        if node.get("Relation Name") not in seeded:
+            continue
+        assert node["Node Type"] == "Bitmap Heap Scan"
+        # full-text and trigram matches each come from their own gin index
+        indexes = {child.get("Index Name", "") for child in nodes(node)}
+        assert any(name.endswith("_user_id_search_vector_idx") for name in indexes)
+        assert any(name.endswith("_user_id_description_idx") for name in indexes)
@@ -0,0 +1,63 @@
+import json
+
+from app import importer
+
+
+def test_import_reports_bad_rows(client, auth, category):
+    rows = [
+        {"amount": 3, "category": category["name"], "date": "2025-02-02"},
+        {"amount": 4, "category": ["groceries"], "date": "2025-02-02"},
+        {"amount": 5, "category": {"name": "groceries"}, "date": "2025-02-02"},
+        {"amount": 6, "category": "nope", "date": "2025-02-02"},
+        ["not", "an", "object"],
+    ]
+    upload = "\n".join(json.dumps(row) for row in rows).encode()
+
+    response = client.post(
+        "/expenses/import",
+        params={"format": "ndjson"},
+        files={"file": ("expenses.ndjson", upload, "application/x-ndjson")},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["imported"] == 1
+    assert body["failed"] == 4
+    assert [error["row"] for error in body["errors"]] == [2, 3, 4, 5]
+
+
+def test_import_csv(client, auth, category):
+    upload = (
+        "amount,category,date,description\n"
+        f"3,{category['name']},2025-02-02,bread\n"
+        "x,groceries,2025-02-02,milk\n"
+    ).encode()
+    response = client.post(
+        "/expenses/import",
+        files={"file": ("expenses.csv", upload, "text/csv")},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["imported"] == 1
+    assert [error["row"] for error in body["errors"]] == [2]
+
+
+def test_import_caps_reported_errors(client, auth, category):
+    # more bad rows than fit in one parse batch, around one good row
+    bad = importer.PARSE_BATCH_SIZE + 500
+    good = {"amount": 3, "category": category["name"], "date": "2025-02-02"}
+    lines = ["garbage"] * bad
+    lines.insert(bad // 2, json.dumps(good))
+    response = client.post(
+        "/expenses/import",
+        params={"format": "ndjson"},
+        files={"file": ("expenses.ndjson", "\n".join(lines).encode())},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["imported"] == 1
+    assert body["failed"] == bad
+    assert len(body["errors"]) == importer.MAX_REPORTED_ERRORS
+    assert body["errors"][0] == {"row": 1, "error": "Invalid JSON"}
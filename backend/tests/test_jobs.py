@@ -0,0 +1,116 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import jobs
+from app.config import settings
+
+
+def wait(client, auth, job_id: str) -> dict:
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}", headers=auth).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+def test_export_job_result(client, auth, category):
+    client.post(
+        "/expenses/",
+        json={"amount": 8, "category_id": category["id"], "date": "2025-07-01"},
+        headers=auth,
+    )
+    response = client.post("/jobs/export", params={"format": "ndjson"}, headers=auth)
+    assert response.status_code == 202, response.text
+
+    job = wait(client, auth, response.json()["id"])
+    assert job["status"] == "done", job["error"]
+    result = client.get(job["result_url"], headers=auth)
+    assert result.status_code == 200
+    assert b'"amount": 8.0' in result.content
+
+
+def test_orphaned_jobs_stop_counting(client, auth, category):
+    # jobs left running by a process that died
+    created_at = datetime.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS + 60)
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.begin() as conn:
+        for _ in range(settings.JOB_MAX_PENDING_PER_USER):
+            conn.execute(
+                text(
+                    "INSERT INTO jobs (id, user_id, kind, status, params, progress, "
+                    "created_at) VALUES (:id, :user_id, 'rollup', 'running', '{}', "
+                    "0, :created_at)"
+                ),
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": category["user_id"],
+                    "created_at": created_at,
+                },
+            )
+    engine.dispose()
+
+    response = client.post("/jobs/rollup", headers=auth)
+    assert response.status_code == 202, response.text
+    assert wait(client, auth, response.json()["id"])["status"] == "done"
+
+
+def test_expired_jobs_are_deleted_with_their_files(client, category, tmp_path):
+    finished = {
+        "expired": datetime.now()
+        - timedelta(seconds=settings.JOB_RETENTION_SECONDS + 60),
+        "kept": datetime.now(),
+    }
+    paths = {name: tmp_path / f"{name}.csv" for name in finished}
+    ids = {name: uuid.uuid4() for name in finished}
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.begin() as conn:
+        for name, finished_at in finished.items():
+            paths[name].write_text("id\n")
+            conn.execute(
+                text(
+                    "INSERT INTO jobs (id, user_id, kind, status, params, progress, "
+                    "result_path, created_at, finished_at) VALUES (:id, :user_id, "
+                    "'export', 'done', '{}', 1, :path, :finished_at, :finished_at)"
+                ),
+                {
+                    "id": ids[name],
+                    "user_id": category["user_id"],
+                    "path": str(paths[name]),
+                    "finished_at": finished_at,
+                },
+            )
+
+    # runs on the app's loop, where job_engine's connections live
+    assert client.portal.call(jobs.expire_jobs) >= 1
+
+    assert not paths["expired"].exists()
+    assert paths["kept"].exists()
+    with engine.connect() as conn:
+        left = conn.execute(
+            text("SELECT id FROM jobs WHERE id IN (:expired, :kept)"), ids
+        ).scalars()
+        assert set(left) == {ids["kept"]}
+    engine.dispose()
+
+
+def test_concurrent_submits_respect_the_pending_limit(client, auth, monkeypatch):
+    # jobs stay queued, so every accepted one counts toward the limit
+    monkeypatch.setattr(jobs.runner, "submit", lambda job_id: None)
+    submits = settings.JOB_MAX_PENDING_PER_USER * 4
+
+    with ThreadPoolExecutor(submits) as pool:
+        responses = list(
+            pool.map(
+                lambda _: client.post("/jobs/rollup", headers=auth), range(submits)
+            )
+        )
+
+    statuses = [response.status_code for response in responses]
+    assert set(statuses) <= {202, 429}
+    assert statuses.count(202) == settings.JOB_MAX_PENDING_PER_USER
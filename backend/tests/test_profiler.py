@@ -0,0 +1,52 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import profiler
+from app.config import settings
+
+
+@pytest.fixture
+def conn(client):
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        yield conn
+    engine.dispose()
+
+
+def test_failed_explain_keeps_the_transaction(conn):
+    plan = profiler._explain(conn, "SELECT * FROM no_such_table", {})
+    assert plan.startswith("explain failed")
+    assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_only_plain_selects_are_explained(conn):
+    statement = (
+        "WITH gone AS (DELETE FROM daily_spend WHERE false RETURNING *) "
+        "SELECT count(*) FROM gone"
+    )
+    assert profiler._explain(conn, statement, {}) is None
+    assert "Result" in profiler._explain(conn, "SELECT 1", {})
+
+
+def test_slow_queries_are_logged_with_plans(
+    client, auth, category, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(settings, "DB_EXPLAIN_SLOW_QUERIES", True)
+
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        response = client.post(
+            "/expenses/",
+            json={"amount": 3, "category_id": category["id"], "date": "2025-01-05"},
+            headers=auth,
+        )
+        assert response.status_code == 200, response.text
+        response = client.get("/expenses/", headers=auth)
+        assert response.status_code == 200, response.text
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("slow query" in message and "plan:" in message for message in messages)
+    assert not any("explain failed" in message for message in messages)
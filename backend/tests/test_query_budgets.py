@@ -0,0 +1,62 @@
+import pytest
+
+from app.cache import principal_cache
+from app.profiler import QueryBudgetExceeded
+
+
+# every call starts with a cold principal cache, the worst case for a budget.
+# conftest turns on DB_QUERY_BUDGET_STRICT, so going over raises
+@pytest.fixture
+def cold(username):
+    def call(request, *args, **kwargs):
+        principal_cache.pop(username)
+        return request(*args, **kwargs)
+
+    return call
+
+
+@pytest.fixture
+def expense(client, auth, category, cold) -> dict:
+    response = cold(
+        client.post,
+        "/expenses/",
+        json={"amount": 10, "category_id": category["id"], "date": "2025-04-01"},
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_create_within_budget(expense):
+    assert expense["amount"] == 10
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"amount": 12},
+        {"description": "moved", "date": "2025-05-01T00:00:00"},
+    ],
+)
+def test_update_within_budget(client, auth, expense, cold, params):
+    response = cold(
+        client.put, f"/expenses/{expense['id']}", params=params, headers=auth
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_delete_within_budget(client, auth, expense, cold):
+    response = cold(client.delete, f"/expenses/{expense['id']}", headers=auth)
+    assert response.status_code == 200, response.text
+
+
+def test_over_budget_raises(client, auth, category, monkeypatch):
+    from app.expenses import create_expense
+
+    monkeypatch.setattr(create_expense, "query_budget", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.post(
+            "/expenses/",
+            json={"amount": 1, "category_id": category["id"], "date": "2025-04-01"},
+            headers=auth,
+        )
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date
+
+from app.db import scheduler_engine
+from app.recurring import add_months, run_pass
+
+
+def run_scheduler(today: date) -> int:
+    async def run():
+        try:
+            return await run_pass(today)
+        finally:
+            await scheduler_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_scheduler_writes_due_occurrences(client, auth, category):
+    today = date.today()
+    start = add_months(today.replace(day=1), -2)
+    response = client.post(
+        "/recurring/",
+        json={
+            "amount": 30,
+            "category_id": category["id"],
+            "freq": "monthly",
+            "start_date": str(start),
+            "count": 4,
+        },
+        headers=auth,
+    )
+    assert response.status_code == 200, response.text
+    # this month and the two before it are written right away
+    assert response.json()["materialized"] == 3
+
+    assert run_scheduler(add_months(today, 1)) >= 1
+    # the rule is exhausted, a second pass adds nothing for it
+    run_scheduler(add_months(today, 6))
+
+    rule = client.get("/recurring/", headers=auth).json()[0]
+    assert rule["materialized"] == 4
+    assert rule["next_date"] is None
+
+    response = client.get(
+        "/analytics/spending",
+        params={
+            "granularity": "year",
+            "date_from": str(start),
+            "date_to": str(add_months(start, 3)),
+        },
+        headers=auth,
+    )
+    assert sum(response.json()["data"]) == 120
+
+
+def test_moving_onto_a_taken_date_conflicts(client, auth, category):
+    start = add_months(date.today().replace(day=1), -1)
+    client.post(
+        "/recurring/",
+        json={
+            "amount": 5,
+            "category_id": category["id"],
+            "freq": "monthly",
+            "start_date": str(start),
+            "count": 2,
+        },
+        headers=auth,
+    )
+    later, earlier = client.get("/expenses/", headers=auth).json()["items"]
+
+    response = client.put(
+        f"/expenses/{earlier['id']}", params={"date": later["date"]}, headers=auth
+    )
+    assert response.status_code == 409, response.text
+
+    response = client.post(
+        "/expenses/batch",
+        json={
+            "operations": [
+                {"op": "update", "id": earlier["id"], "date": later["date"]}
+            ]
+        },
+        headers=auth,
+    )
+    assert response.status_code == 409, response.text
+
+    items = client.get("/expenses/", headers=auth).json()["items"]
+    assert [item["date"] for item in items] == [later["date"], earlier["date"]]
@@ -0,0 +1,74 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, text
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import cache, db
+from app.versions import bump_data_version
+
+
+# which engine ran each statement that reads expenses or categories
+@pytest.fixture
+def routed():
+    seen: list[str] = []
+    listeners = []
+    for name, engine in (("primary", db.engine), ("replica", db.replica_engine)):
+
+        def record(conn, cursor, statement, *args, name=name):
+            if "FROM expenses" in statement or "FROM categories" in statement:
+                seen.append(name)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        listeners.append((engine, record))
+
+    yield seen
+
+    for engine, record in listeners:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def test_replica_is_configured(client):
+    assert db.replica_engine is not db.engine
+    assert db.replica_engine in db.engines
+
+
+def test_reads_go_to_the_replica(client, auth, routed):
+    for path in ("/expenses/", "/categories/", "/analytics/dashboard"):
+        assert client.get(path, headers=auth).status_code == 200
+    assert routed
+    assert set(routed) == {"replica"}
+
+
+def test_writer_sticks_to_the_primary(client, auth, category, routed, monkeypatch):
+    user_id = uuid.UUID(category["user_id"])
+    # creating the category committed a write moments ago
+    assert db.read_engine(user_id) is db.engine
+    client.get("/expenses/", headers=auth)
+    assert routed == ["primary"]
+
+    # once the window runs out the user reads from the replica again
+    routed.clear()
+    later = cache.time.monotonic() + db.settings.DB_REPLICA_STICKY_SECONDS + 1
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: later))
+    assert db.read_engine(user_id) is db.replica_engine
+    client.get("/expenses/", headers=auth)
+    assert routed == ["replica"]
+
+
+def test_rolled_back_writes_do_not_stick(client, category):
+    user_id = uuid.UUID(category["user_id"])
+    db.recent_writers.pop(user_id)
+
+    async def write_and_roll_back():
+        async with AsyncSession(db.engine) as session:
+            await bump_data_version(session, user_id)
+            await session.rollback()
+            # a later commit on the same session wrote nothing
+            await session.execute(text("SELECT 1"))
+            await session.commit()
+
+    client.portal.call(write_and_roll_back)
+    assert db.read_engine(user_id) is db.replica_engine
@@ -0,0 +1,18 @@
+def test_emptied_days_leave_the_rollup(client, auth, category):
+    ids = []
+    for day in ("2025-06-01", "2025-06-02"):
+        response = client.post(
+            "/expenses/",
+            json={"amount": 4, "category_id": category["id"], "date": day},
+            headers=auth,
+        )
+        ids.append(response.json()["id"])
+
+    client.delete(f"/expenses/{ids[0]}", headers=auth)
+    response = client.put(
+        f"/expenses/{ids[1]}", params={"date": "2025-06-03"}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get("/analytics/spending-by-date", headers=auth)
+    assert response.json() == {"labels": ["2025-06-03"], "data": [4.0]}
@@ -0,0 +1,77 @@
+import pytest
+
+DESCRIPTIONS = [
+    "coffee beans",
+    "coffee with friends",
+    "morning coffee",
+    "coffe shop",
+    "train ticket",
+    "cinema tickets",
+]
+
+
+@pytest.fixture
+def expenses(client, auth, category) -> dict[str, str]:
+    operations = [
+        {
+            "op": "create",
+            "amount": 1,
+            "category_id": category["id"],
+            "date": "2025-06-01",
+            "description": description,
+        }
+        for description in DESCRIPTIONS
+    ]
+    response = client.post(
+        "/expenses/batch", json={"operations": operations}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+    return {
+        result["expense"]["description"]: result["id"]
+        for result in response.json()["results"]
+    }
+
+
+def search(client, auth, q: str, **params) -> dict:
+    response = client.get(
+        "/expenses/search", params={"q": q, **params}, headers=auth
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_full_text_matches_rank_first(client, auth, expenses):
+    found = [item["description"] for item in search(client, auth, "coffee")["items"]]
+    # the misspelled shop only matches by trigram similarity, so it comes last
+    assert sorted(found[:3]) == [
+        "coffee beans",
+        "coffee with friends",
+        "morning coffee",
+    ]
+    assert found[3:] == ["coffe shop"]
+
+
+def test_typos_match_by_similarity(client, auth, expenses):
+    found = {item["description"] for item in search(client, auth, "tickett")["items"]}
+    assert found == {"train ticket", "cinema tickets"}
+
+
+def test_deleted_expenses_are_not_found(client, auth, expenses):
+    client.delete(f"/expenses/{expenses['train ticket']}", headers=auth)
+    found = {item["description"] for item in search(client, auth, "train")["items"]}
+    assert "train ticket" not in found
+
+
+def test_pages_follow_the_ranking(client, auth, expenses):
+    everything = [item["id"] for item in search(client, auth, "coffee")["items"]]
+
+    paged, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        page = search(client, auth, "coffee", **params)
+        paged.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert paged == everything
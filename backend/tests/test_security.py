@@ -0,0 +1,65 @@
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.security import (
+    PasswordHasher,
+    hash_password,
+    password_hasher,
+    verify_password,
+)
+
+
+def test_hasher_replaces_a_broken_pool():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    hasher.start()
+
+    async def run():
+        hashed = await hasher.run(hash_password, "secret")
+
+        # a worker killed from outside, like the OOM killer would
+        for process in list(hasher._executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        time.sleep(0.5)
+
+        broken = hasher._executor
+        assert await hasher.run(verify_password, "secret", hashed)
+        assert hasher._executor is not broken
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+
+# users from the auth fixture are registered with this password
+def login(client, username: str):
+    return client.post(
+        "/auth/login", data={"username": username, "password": "password"}
+    )
+
+
+def test_logins_over_the_pending_limit_are_turned_away(
+    client, auth, username, monkeypatch
+):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = login(client, username)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_concurrent_logins_get_a_token_or_a_503(client, auth, username, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 1)
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(login, client, username) for _ in range(8)]
+        # a stuck hasher would hang here instead of answering
+        responses = [future.result(timeout=30) for future in futures]
+
+    statuses = [response.status_code for response in responses]
+    assert set(statuses) == {200, 503}
+    for response in responses:
+        if response.status_code == 503:
+            assert response.headers["retry-after"] == "1"
+    assert password_hasher.pending == 0
@@ -15,6 +15,19 @@ export interface SpendingByMonth {
   data: number[];
 }
 
+export interface Series<T = string> {
+  labels: T[];
+  data: number[];
+}
+
+export interface Dashboard {
+  total: number;
+  count: number;
+  by_date: Series;
+  by_category: Series;
+  by_month: Series;
+}
+
 export const analyticsApi = {
   getSpendingByDate: () => 
     api<SpendingByDate>('/analytics/spending-by-date'),
@@ -24,4 +37,13 @@ export const analyticsApi = {
   
   getSpendingByMonth: () => 
     api<SpendingByMonth>('/analytics/spending-by-month'),
+
+  getDashboard: (filters: { date_from?: string; date_to?: string; category_id?: string } = {}) => {
+    const params = new URLSearchParams();
+    if (filters.date_from) params.append('date_from', filters.date_from);
+    if (filters.date_to) params.append('date_to', filters.date_to);
+    if (filters.category_id) params.append('category_id', filters.category_id);
+
+    return api<Dashboard>(`/analytics/dashboard?${params.toString()}`);
+  },
 };
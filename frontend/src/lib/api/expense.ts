@@ -12,16 +12,29 @@ export interface Expense {
   };
 }
 
+export interface ExpensePage {
+  items: Expense[];
+  next_cursor: string | null;
+}
+
+export interface ExpenseFilters {
+  date_from?: string;
+  date_to?: string;
+  category_id?: string;
+}
+
 export const expensesApi = {
-  getAll: (filters: { date_from?: string; date_to?: string; category_id?: string }) => {
+  getPage: (filters: ExpenseFilters, cursor?: string | null, limit?: number) => {
     const params = new URLSearchParams();
     if (filters.date_from) params.append('date_from', filters.date_from);
     if (filters.date_to) params.append('date_to', filters.date_to);
     if (filters.category_id) params.append('category_id', filters.category_id);
-    
-    return api<Expense[]>(`/expenses/?${params.toString()}`);
+    if (cursor) params.append('cursor', cursor);
+    if (limit) params.append('limit', limit.toString());
+
+    return api<ExpensePage>(`/expenses/?${params.toString()}`);
   },
-  
+
   create: (data: { amount: number; category_id: string; date: string; description?: string }) =>
     api<Expense>('/expenses/', {
       method: 'POST',